@@ -7,6 +7,10 @@ from src.routes.portfolio import router as portfolio_router
 from src.routes.users import router as users_router
 from prisma import Prisma
 from src.websocket import register_websocket
+from src.services.http_client import clients as upstream_clients
+from src.ml.training_jobs import training_jobs
+from src.ml.warmup import ml_warmup
+from src.ml.precompute import prediction_precompute
 import asyncio
 
 # Configure logging - Set to WARNING to reduce noise and security risks
@@ -39,6 +43,20 @@ app.add_middleware(
 async def read_root():
     return {"message": "Welcome to the Trading Dashboard API"}
 
+@app.get("/ready")
+async def readiness():
+    """Core API is ready once started; ML subsystems report their warm-up state."""
+    ml = ml_warmup.status()
+    return {
+        "ready": True,
+        "ml_ready": all(s["state"] == "ready" for s in ml.values()),
+        "subsystems": {
+            "api": {"state": "ready"},
+            "upstream_http": {"state": "ready" if upstream_clients.started else "cold"},
+            **ml,
+        },
+    }
+
 # Mount modular routers
 app.include_router(market_router)
 app.include_router(predictions_router)
@@ -56,10 +74,22 @@ async def startup_event():
             logger.warning("No database URL configured - running in read-only mode")
         else:
             logger.info("Database URL configured")
+        # Shared pooled HTTP client for Twelve Data calls
+        await upstream_clients.startup()
+        # Load pandas/sklearn/TensorFlow off the event loop after startup
+        ml_warmup.start()
+        # Warm the prediction cache for watchlisted symbols after each close
+        prediction_precompute.start()
         logger.info("API startup completed successfully")
     except Exception as e:
         logger.error(f"Startup error: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await prediction_precompute.shutdown()
+    await training_jobs.shutdown()
+    await upstream_clients.shutdown()
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     logger.error(f"Global exception: {exc}")
@@ -0,0 +1,300 @@
+"""Content-addressed, atomically published model artifacts.
+
+Layout under ``MODEL_STORE_DIR`` (default ``src/models/store``)::
+
+    objects/ab/abcd...            one file per distinct content (sha256)
+    versions/AAPL/<ts>-<hash>/    model.keras, model.npz, feat_scaler.gz,
+                                  tgt_scaler.gz (hard links into objects/)
+                                  and meta.json
+    pointers/AAPL.json            {"version": ...}: the published latest
+
+A version directory is assembled under a temporary name and renamed into
+place, then the pointer file is swapped with ``os.replace``. Readers
+therefore see either the old bundle or the new one, never a mix. Identical
+files are stored once. Publishing a bundle identical to the current latest
+is a no-op. After each publish, versions beyond ``MODEL_KEEP_VERSIONS`` per
+symbol are removed, along with objects no version links to.
+
+Older versions whose lite export is float16 or int8 and passed its drift
+check also lose their full-precision ``model.keras`` (``MODEL_PRUNE_KERAS``,
+on by default). They are then served and backtested from the export alone.
+Only the latest version keeps the Keras file, which fine-tuning warm-starts
+from.
+"""
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+
+MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "models"))
+BUNDLE_FILES = {
+    "model": "model.keras",
+    "lite": "model.npz",
+    "feat_scaler": "feat_scaler.gz",
+    "tgt_scaler": "tgt_scaler.gz",
+}
+REQUIRED = ("model", "feat_scaler", "tgt_scaler")
+# A stored version needs its scalers plus at least one runtime
+RUNTIMES = ("model", "lite")
+REDUCED_PRECISIONS = ("float16", "int8")
+# Unlinked objects younger than this may belong to a publish in progress
+GC_GRACE_SECONDS = 600
+# Scratch directories left behind by crashed training runs
+TMP_MAX_AGE_SECONDS = 86400
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactStore:
+    def __init__(self, root: str = None, keep: int = None):
+        self.root = root or os.getenv("MODEL_STORE_DIR") or os.path.join(MODELS_DIR, "store")
+        self.keep = keep or int(os.getenv("MODEL_KEEP_VERSIONS", 5))
+        self.prune_keras = os.getenv("MODEL_PRUNE_KERAS", "1") not in ("0", "false", "False", "")
+        self.published = 0
+        self.deduped = 0
+        self.versions_removed = 0
+        self.objects_removed = 0
+        self.keras_pruned = 0
+
+    def _dir(self, *parts) -> str:
+        path = os.path.join(self.root, *parts)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @contextmanager
+    def _locked(self):
+        with open(os.path.join(self._dir(), ".lock"), "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def workdir(self) -> str:
+        """Private scratch directory for one training run (same filesystem as the store)."""
+        return tempfile.mkdtemp(prefix="run-", dir=self._dir("tmp"))
+
+    def _put_object(self, path: str) -> str:
+        digest = _sha256(path)
+        obj = os.path.join(self._dir("objects", digest[:2]), digest)
+        if not os.path.exists(obj):
+            tmp = f"{obj}.{uuid.uuid4().hex}.tmp"
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, obj)
+        return obj
+
+    def _pointer(self, symbol: str) -> str:
+        return os.path.join(self._dir("pointers"), f"{symbol}.json")
+
+    def latest_version(self, symbol: str):
+        try:
+            with open(self._pointer(symbol)) as f:
+                return json.load(f)["version"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def latest(self, symbol: str):
+        """Paths of the published bundle for ``symbol``, or ``None``."""
+        return self.bundle(symbol, self.latest_version(symbol))
+
+    def bundle(self, symbol: str, version: str):
+        """Paths of one stored version of ``symbol``, or ``None`` if it is gone."""
+        if not version or os.sep in version or version.startswith("."):
+            return None
+        vdir = os.path.join(self.root, "versions", symbol, version)
+        paths = {key: os.path.join(vdir, name) for key, name in BUNDLE_FILES.items()}
+        paths = {key: path for key, path in paths.items() if os.path.exists(path)}
+        if "feat_scaler" not in paths or "tgt_scaler" not in paths:
+            return None
+        if not any(key in paths for key in RUNTIMES):
+            return None
+        return paths
+
+    def publish(self, symbol: str, files: dict, meta: dict = None) -> str:
+        """Store ``files`` (keys of ``BUNDLE_FILES``) as a new version and make it latest."""
+        missing = [key for key in REQUIRED if key not in files]
+        if missing:
+            raise ValueError(f"Bundle is missing {', '.join(missing)}")
+        objects = {key: self._put_object(path) for key, path in files.items()}
+        bundle_hash = hashlib.sha256(
+            "".join(f"{k}={os.path.basename(objects[k])};" for k in sorted(objects)).encode()
+        ).hexdigest()
+        with self._locked():
+            current = self.latest_version(symbol)
+            if current is not None and current.endswith(bundle_hash[:12]):
+                self.deduped += 1
+                return current
+            version = f"{time.strftime('%Y%m%d%H%M%S')}-{bundle_hash[:12]}"
+            staging = tempfile.mkdtemp(prefix="version-", dir=self._dir("tmp"))
+            for key, obj in objects.items():
+                dest = os.path.join(staging, BUNDLE_FILES[key])
+                try:
+                    os.link(obj, dest)
+                except OSError:
+                    shutil.copyfile(obj, dest)  # no hard links on this filesystem
+            with open(os.path.join(staging, "meta.json"), "w") as f:
+                json.dump({"symbol": symbol, "version": version, "bundle_sha256": bundle_hash,
+                           "objects": {k: os.path.basename(v) for k, v in objects.items()},
+                           "published_at": time.time(), **(meta or {})}, f)
+            os.rename(staging, os.path.join(self._dir("versions", symbol), version))
+            tmp_pointer = f"{self._pointer(symbol)}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_pointer, "w") as f:
+                json.dump({"version": version}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_pointer, self._pointer(symbol))
+            self.published += 1
+            self._gc(symbol)
+        return version
+
+    def meta(self, symbol: str, version: str = None):
+        """``meta.json`` of ``version`` (default: the latest), or ``None``."""
+        version = version or self.latest_version(symbol)
+        if version is None:
+            return None
+        try:
+            with open(os.path.join(self.root, "versions", symbol, version, "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def versions(self, symbol: str):
+        """Version metadata for ``symbol``, newest first."""
+        vroot = os.path.join(self.root, "versions", symbol)
+        if not os.path.isdir(vroot):
+            return []
+        out = []
+        for version in sorted(os.listdir(vroot), reverse=True):
+            try:
+                with open(os.path.join(vroot, version, "meta.json")) as f:
+                    out.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return out
+
+    def gc(self, symbol: str = None):
+        with self._locked():
+            self._gc(symbol)
+
+    def _gc(self, symbol: str = None):
+        vroot = os.path.join(self.root, "versions")
+        symbols = [symbol] if symbol else (os.listdir(vroot) if os.path.isdir(vroot) else [])
+        for sym in symbols:
+            sdir = os.path.join(vroot, sym)
+            if not os.path.isdir(sdir):
+                continue
+            current = self.latest_version(sym)
+            versions = sorted(os.listdir(sdir), reverse=True)
+            for version in versions[self.keep:]:
+                if version != current:
+                    shutil.rmtree(os.path.join(sdir, version), ignore_errors=True)
+                    self.versions_removed += 1
+            if self.prune_keras:
+                for version in versions[:self.keep]:
+                    if version != current:
+                        self._prune_keras(os.path.join(sdir, version))
+        # An object whose only link is its own entry is no longer part of any version
+        cutoff = time.time() - GC_GRACE_SECONDS
+        oroot = os.path.join(self.root, "objects")
+        for dirpath, _, names in os.walk(oroot):
+            for name in names:
+                path = os.path.join(dirpath, name)
+                st = os.stat(path)
+                if st.st_nlink == 1 and st.st_mtime < cutoff:
+                    os.unlink(path)
+                    self.objects_removed += 1
+        troot = os.path.join(self.root, "tmp")
+        if os.path.isdir(troot):
+            for name in os.listdir(troot):
+                path = os.path.join(troot, name)
+                if os.stat(path).st_mtime < time.time() - TMP_MAX_AGE_SECONDS:
+                    shutil.rmtree(path, ignore_errors=True)
+
+    def _prune_keras(self, vdir: str):
+        """Drop a version's ``model.keras`` once its reduced-precision export passed the drift check."""
+        keras_path = os.path.join(vdir, BUNDLE_FILES["model"])
+        if not os.path.exists(keras_path) or not os.path.exists(os.path.join(vdir, BUNDLE_FILES["lite"])):
+            return
+        meta_path = os.path.join(vdir, "meta.json")
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        lite = meta.get("lite") or {}
+        if lite.get("precision") not in REDUCED_PRECISIONS or lite.get("fallback"):
+            return
+        tmp = f"{meta_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({**meta, "keras_pruned": True}, f)
+        os.replace(tmp, meta_path)
+        # The object itself goes once no other version links to it
+        os.unlink(keras_path)
+        self.keras_pruned += 1
+
+    def stats(self) -> dict:
+        return {
+            "root": self.root,
+            "keep_versions": self.keep,
+            "prune_keras": self.prune_keras,
+            "published": self.published,
+            "deduped": self.deduped,
+            "versions_removed": self.versions_removed,
+            "objects_removed": self.objects_removed,
+            "keras_pruned": self.keras_pruned,
+        }
+
+
+artifact_store = ArtifactStore()
+
+
+def publish_training_run(symbol: str, model_path: str, feat_scaler, tgt_scaler, workdir: str, meta: dict = None,
+                         store: ArtifactStore = artifact_store) -> str:
+    """Dump the scalers, export the lite runtime and publish the bundle from ``workdir``.
+
+    The lite export uses ``MODEL_WEIGHT_PRECISION``. Its drift check is
+    recorded in the version's metadata under ``lite``.
+    """
+    import joblib
+    from src.ml.lite import export_checked
+
+    lite_path, lite_report = export_checked(model_path, os.path.join(workdir, BUNDLE_FILES["lite"]))
+    files = {
+        "model": model_path,
+        "lite": lite_path,
+        "feat_scaler": os.path.join(workdir, BUNDLE_FILES["feat_scaler"]),
+        "tgt_scaler": os.path.join(workdir, BUNDLE_FILES["tgt_scaler"]),
+    }
+    joblib.dump(feat_scaler, files["feat_scaler"])
+    joblib.dump(tgt_scaler, files["tgt_scaler"])
+    return store.publish(symbol, files, {**(meta or {}), "lite": lite_report})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Model artifact store maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    listing = sub.add_parser("list", help="Show a symbol's versions, newest first")
+    listing.add_argument("symbol")
+    collect = sub.add_parser("gc", help="Apply the retention policy and drop unlinked objects")
+    collect.add_argument("--symbol", default=None)
+    args = parser.parse_args()
+    if args.command == "list":
+        latest = artifact_store.latest_version(args.symbol)
+        for meta in artifact_store.versions(args.symbol):
+            marker = "*" if meta["version"] == latest else " "
+            print(f"{marker} {meta['version']}")
+    else:
+        artifact_store.gc(args.symbol)
+        print(json.dumps(artifact_store.stats()))
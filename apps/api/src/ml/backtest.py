@@ -0,0 +1,166 @@
+"""Walk-forward backtest of a symbol's LSTM over a date range.
+
+Every evaluation window is a strided view over one scaled feature matrix,
+so ``N`` days to evaluate make one ``(N, 60, 9)`` tensor and one batched
+forward pass, rather than ``N`` single-window predictions. Window ``i``
+predicts the close of the bar right after it, using only bars up to its own
+last bar, which makes the evaluation walk-forward. The model and scalers are
+fixed to one version: a published artifact-store version or the current
+latest.
+
+``python -m src.ml.backtest AAPL --start 2024-01-01 --end 2024-12-31``
+prints the report as JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+from src.ml.artifacts import artifact_store
+from src.ml.features import SEQ_LEN, feature_matrix, sliding_windows
+
+# Bars needed before the first evaluated window: the window plus indicator warm-up
+WARMUP_BARS = SEQ_LEN + 20
+
+
+def resolve_artifacts(symbol: str, version: str = None):
+    """``(paths, version)`` for a stored version, or the latest bundle when ``version`` is omitted."""
+    if version:
+        paths = artifact_store.bundle(symbol, version)
+        if paths is None:
+            raise FileNotFoundError(f"Model version '{version}' not found for '{symbol}'")
+        return paths, version
+    from src.ml.model_predict import _latest_artifacts, model_version
+
+    paths = _latest_artifacts(symbol)
+    if not all(os.path.exists(p) for p in paths.values()):
+        raise FileNotFoundError("Latest artifacts not found. Train the model first.")
+    return paths, model_version(symbol, paths)
+
+
+def _load(paths: dict, runtime: str = None):
+    import joblib
+
+    runtime = runtime or ("lite" if paths.get("lite") else "keras")
+    if runtime == "lite":
+        from src.ml.lite import LiteModel
+
+        if not paths.get("lite"):
+            raise FileNotFoundError("This model version has no lite export")
+        model = LiteModel.load(paths["lite"])
+        forward = model.predict
+    else:
+        from tensorflow.keras.models import load_model
+
+        if not paths.get("model"):
+            raise FileNotFoundError("This model version's Keras file was pruned; use the lite runtime")
+        model = load_model(paths["model"], compile=False)
+        forward = lambda x: model(x, training=False).numpy()  # noqa: E731
+    return forward, joblib.load(paths["feat_scaler"]), joblib.load(paths["tgt_scaler"]), runtime
+
+
+def _metrics(pred: np.ndarray, actual: np.ndarray, prev: np.ndarray) -> dict:
+    err = pred - actual
+    moved = actual != prev
+    hits = np.sign(pred - prev)[moved] == np.sign(actual - prev)[moved]
+    return {
+        "mae": float(np.mean(np.abs(err))),
+        "rmse": float(np.sqrt(np.mean(err ** 2))),
+        "mape": float(np.mean(np.abs(err) / np.maximum(np.abs(actual), 1e-9)) * 100),
+        "directional_hit_rate": float(hits.mean()) if hits.size else None,
+        # Predicting the last close; a useful model beats this
+        "naive_mae": float(np.mean(np.abs(prev - actual))),
+    }
+
+
+def run_backtest(symbol: str, df: pd.DataFrame, paths: dict, version: str, start: datetime = None,
+                 end: datetime = None, runtime: str = None, seq_len: int = SEQ_LEN,
+                 include_series: bool = False) -> dict:
+    """Evaluate every window whose target bar falls in ``[start, end]`` in one forward pass."""
+    data, target, ts = feature_matrix(df, return_ts=True)
+    forward, feat_scaler, tgt_scaler, runtime = _load(paths, runtime)
+    data_scaled = np.ascontiguousarray(feat_scaler.transform(data), dtype=np.float32)
+
+    # Window i covers rows [i, i + seq_len) and predicts row i + seq_len
+    target_ts = ts[seq_len:]
+    lo = int(np.searchsorted(target_ts, start.timestamp())) if start else 0
+    hi = int(np.searchsorted(target_ts, end.timestamp(), side="right")) if end else len(target_ts)
+    if hi <= lo:
+        raise ValueError("No evaluation windows in the requested range.")
+    windows = sliding_windows(data_scaled[:-1], seq_len)[lo:hi]
+
+    started = time.perf_counter()
+    pred_scaled = forward(windows)
+    forward_seconds = time.perf_counter() - started
+    pred = tgt_scaler.inverse_transform(pred_scaled)[:, 0]
+    actual = target[seq_len + lo:seq_len + hi, 0]
+    prev = target[seq_len + lo - 1:seq_len + hi - 1, 0]
+
+    report = {
+        "symbol": symbol,
+        "model_version": version,
+        "runtime": runtime,
+        "start": datetime.fromtimestamp(int(target_ts[lo]), tz=timezone.utc).date().isoformat(),
+        "end": datetime.fromtimestamp(int(target_ts[hi - 1]), tz=timezone.utc).date().isoformat(),
+        "windows": int(hi - lo),
+        "forward_pass_seconds": round(forward_seconds, 4),
+        "metrics": _metrics(pred, actual, prev),
+    }
+    if include_series:
+        report["series"] = [
+            {"date": datetime.fromtimestamp(int(t), tz=timezone.utc).date().isoformat(),
+             "predicted": float(p), "actual": float(a)}
+            for t, p, a in zip(target_ts[lo:hi], pred, actual)
+        ]
+    return report
+
+
+async def load_frame(symbol: str, start: datetime, end: datetime) -> pd.DataFrame:
+    """Daily bars from ``start`` (minus the warm-up) to ``end``, as a ``get_data`` frame."""
+    from src.services.bar_cache import bar_cache
+    from src.services.rate_limiter import Priority
+
+    # Trading days are ~5/7 of calendar days; pad for holidays
+    head = start - timedelta(days=int(WARMUP_BARS * 7 / 5) + 14)
+    bars = await bar_cache.get_bars(symbol, "1day", head, end, priority=Priority.HISTORY)
+    return pd.DataFrame({"Date": bars.dates(), **bars.columns})
+
+
+async def backtest(symbol: str, version: str = None, start: datetime = None, end: datetime = None,
+                   runtime: str = None, include_series: bool = False) -> dict:
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=365)
+    paths, version = resolve_artifacts(symbol, version)
+    df = await load_frame(symbol, start, end)
+    return await asyncio.to_thread(
+        run_backtest, symbol, df, paths, version, start, end, runtime, SEQ_LEN, include_series
+    )
+
+
+def parse_date(value: str):
+    return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc) if value else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of a symbol's model")
+    parser.add_argument("symbol")
+    parser.add_argument("--version", default=None, help="Artifact store version (default: latest)")
+    parser.add_argument("--start", default=None, help="YYYY-MM-DD (default: one year before --end)")
+    parser.add_argument("--end", default=None, help="YYYY-MM-DD (default: today)")
+    parser.add_argument("--runtime", choices=("lite", "keras"), default=None)
+    parser.add_argument("--series", action="store_true", help="Include per-day predictions")
+    args = parser.parse_args(argv)
+    end = parse_date(args.end)
+    if end is not None:
+        end += timedelta(days=1) - timedelta(seconds=1)
+    report = asyncio.run(backtest(
+        args.symbol, args.version, parse_date(args.start), end, args.runtime, args.series
+    ))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
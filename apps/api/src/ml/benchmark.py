@@ -0,0 +1,105 @@
+"""Training throughput benchmark for sizing workers per machine.
+
+Each configuration trains the production LSTM for a few epochs in freshly
+spawned processes, since thread settings only apply before TensorFlow
+starts. ``--parallel P`` runs P identical trainings at once, the way
+``TRAINING_WORKERS=P`` would. Per-process and aggregate samples per second
+are printed as one JSON line per configuration, using the median of the
+epochs after the first so graph tracing is excluded::
+
+    python -m src.ml.benchmark --threads 1 2 4 --batch-size 32 128 --parallel 1 2
+
+Data is a synthetic random walk of ``--bars`` daily bars run through the
+real feature pipeline (``--symbol AAPL`` trains on fetched bars instead).
+Nothing is published to the artifact store.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+
+def synthetic_frame(bars: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, bars))
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=bars)
+    return pd.DataFrame({
+        "Date": dates.strftime("%Y-%m-%d"),
+        "Open": close + rng.normal(0, 0.3, bars),
+        "High": close + rng.uniform(0.2, 1.5, bars),
+        "Low": close - rng.uniform(0.2, 1.5, bars),
+        "Close": close,
+        "Volume": rng.uniform(1e6, 5e6, bars),
+    })
+
+
+def _init(config_kwargs: dict):
+    from src.ml.training_config import TrainingConfig
+
+    TrainingConfig(**config_kwargs).apply()
+
+
+def _bench(df: pd.DataFrame, config_kwargs: dict, epochs: int) -> dict:
+    import tempfile
+    from src.ml.model_predict import _fit, build_model, preprocess
+    from src.ml.training_config import TrainingConfig
+
+    config = TrainingConfig(**config_kwargs, epoch_timing=True)
+    X_train, X_val, y_train, y_val, _ = preprocess(df)
+    model = build_model(X_train.shape[1:])
+    with tempfile.TemporaryDirectory() as tmp:
+        # patience=epochs keeps early stopping from cutting the measurement short
+        _, timing = _fit(model, X_train, y_train, X_val, y_val, os.path.join(tmp, "best.keras"),
+                         None, epochs, config, patience=epochs)
+    return {"train_samples": int(len(X_train)), **timing}
+
+
+def run(df: pd.DataFrame, threads: int, batch_size: int, prefetch: bool, parallel: int, epochs: int) -> dict:
+    config_kwargs = {"intra_op_threads": threads, "batch_size": batch_size, "prefetch": prefetch}
+    ctx = multiprocessing.get_context("spawn")  # TensorFlow is not fork-safe
+    with ProcessPoolExecutor(max_workers=parallel, mp_context=ctx, initializer=_init,
+                             initargs=(config_kwargs,)) as pool:
+        results = list(pool.map(_bench, [df] * parallel, [config_kwargs] * parallel, [epochs] * parallel))
+    per_process = [r["samples_per_second"] for r in results]
+    return {
+        "threads": threads,
+        "batch_size": batch_size,
+        "prefetch": prefetch,
+        "parallel": parallel,
+        "train_samples": results[0]["train_samples"],
+        "epoch_seconds_median": float(np.median([r["epoch_seconds_median"] for r in results])),
+        "samples_per_second": round(float(np.median(per_process)), 1),
+        "aggregate_samples_per_second": round(float(sum(per_process)), 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LSTM training throughput benchmark")
+    parser.add_argument("--threads", type=int, nargs="+", default=[os.cpu_count() or 1],
+                        help="Intra-op threads per process")
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[32])
+    parser.add_argument("--parallel", type=int, nargs="+", default=[1], help="Concurrent training processes")
+    parser.add_argument("--no-prefetch", action="store_true", help="Also measure fit on plain arrays")
+    parser.add_argument("--epochs", type=int, default=4)
+    parser.add_argument("--bars", type=int, default=1000)
+    parser.add_argument("--symbol", default=None)
+    args = parser.parse_args(argv)
+
+    if args.symbol:
+        from src.ml.model_predict import get_data
+
+        df = asyncio.run(get_data(args.symbol))
+    else:
+        df = synthetic_frame(args.bars)
+    prefetch = [True, False] if args.no_prefetch else [True]
+    for threads, batch_size, pf, parallel in itertools.product(args.threads, args.batch_size, prefetch, args.parallel):
+        print(json.dumps(run(df, threads, batch_size, pf, parallel, args.epochs)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
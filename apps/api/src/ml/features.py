@@ -0,0 +1,104 @@
+"""Feature pipeline shared by training and inference.
+
+Indicators are computed once per frame, the feature matrix is kept as a
+single C-contiguous float32 array, and LSTM windows are strided views over
+it: ``sliding_windows`` costs no copy no matter how long the history is.
+Training pulls one shuffled batch of windows at a time through
+``window_dataset``. Inference only needs the last window, which live
+predictions take from the streaming engine in ``src/services/indicators.py``;
+``tests/test_features.py`` checks that engine against this ``ta`` pipeline.
+"""
+import numpy as np
+import pandas as pd
+
+FEATURE_COLS = ['Open', 'High', 'Low', 'Close', 'Volume', 'RSI_14', 'SMA_20', 'BB_High', 'BB_Low']
+TARGET_COL = 'Close'
+DTYPE = np.float32
+SEQ_LEN = 60
+
+
+def add_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    import ta
+
+    df['Date'] = pd.to_datetime(df['Date'])
+    df.set_index('Date', inplace=True)
+    df['RSI_14'] = ta.momentum.RSIIndicator(df['Close'], window=14).rsi()
+    df['SMA_20'] = ta.trend.SMAIndicator(df['Close'], window=20).sma_indicator()
+    bb = ta.volatility.BollingerBands(df['Close'], window=20, window_dev=2)
+    df['BB_High'] = bb.bollinger_hband()
+    df['BB_Low'] = bb.bollinger_lband()
+    df.dropna(inplace=True)
+    return df
+
+
+def feature_matrix(df: pd.DataFrame, return_ts: bool = False):
+    """``(features, target)`` as float32 arrays of shape ``(n, 9)`` and ``(n, 1)``.
+
+    With ``return_ts`` the rows' epoch-second timestamps are returned third.
+    """
+    df = add_technical_indicators(df)
+    data = np.ascontiguousarray(df[FEATURE_COLS].to_numpy(dtype=DTYPE))
+    target = df[[TARGET_COL]].to_numpy(dtype=DTYPE)
+    if return_ts:
+        return data, target, bar_timestamps(df.index)
+    return data, target
+
+
+def bar_timestamps(dates) -> np.ndarray:
+    """Epoch seconds (UTC) of a date column or index, as int64."""
+    dates = pd.DatetimeIndex(pd.to_datetime(dates))
+    if dates.tz is None:
+        dates = dates.tz_localize("UTC")
+    return dates.as_unit("s").asi8.astype(np.int64)
+
+
+def sliding_windows(data: np.ndarray, seq_len: int = SEQ_LEN) -> np.ndarray:
+    """Read-only ``(n - seq_len + 1, seq_len, f)`` view of every window of ``data``."""
+    n, f = data.shape
+    if n < seq_len:
+        return np.empty((0, seq_len, f), dtype=data.dtype)
+    row, col = data.strides
+    return np.lib.stride_tricks.as_strided(
+        data, shape=(n - seq_len + 1, seq_len, f), strides=(row, row, col), writeable=False
+    )
+
+
+def fit_scalers(data: np.ndarray, target: np.ndarray):
+    from sklearn.preprocessing import MinMaxScaler
+
+    feat_scaler = MinMaxScaler()
+    tgt_scaler = MinMaxScaler()
+    data_scaled = feat_scaler.fit_transform(data).astype(DTYPE, copy=False)
+    target_scaled = tgt_scaler.fit_transform(target).astype(DTYPE, copy=False)
+    return feat_scaler, tgt_scaler, data_scaled, target_scaled
+
+
+def training_windows(data_scaled: np.ndarray, target_scaled: np.ndarray, seq_len: int = SEQ_LEN, split: float = 0.8):
+    """Chronological train/validation windows; ``X`` parts are views, window ``i`` predicts bar ``i + seq_len``."""
+    X = sliding_windows(data_scaled[:-1], seq_len)
+    y = target_scaled[seq_len:]
+    split_index = int(split * len(X))
+    return X[:split_index], X[split_index:], y[:split_index], y[split_index:]
+
+
+def window_dataset(X: np.ndarray, y: np.ndarray, batch_size: int = 32, shuffle: bool = True):
+    """``tf.data`` pipeline that gathers one batch of windows at a time from a view."""
+    import tensorflow as tf
+
+    n = len(X)
+
+    def batches():
+        order = np.random.permutation(n) if shuffle else np.arange(n)
+        for lo in range(0, n, batch_size):
+            idx = order[lo:lo + batch_size]
+            yield X[idx], y[idx]
+
+    steps = -(-n // batch_size)
+    ds = tf.data.Dataset.from_generator(
+        batches,
+        output_signature=(
+            tf.TensorSpec(shape=(None, *X.shape[1:]), dtype=tf.as_dtype(X.dtype)),
+            tf.TensorSpec(shape=(None, *y.shape[1:]), dtype=tf.as_dtype(y.dtype)),
+        ),
+    )
+    return ds.apply(tf.data.experimental.assert_cardinality(steps)).prefetch(tf.data.AUTOTUNE)
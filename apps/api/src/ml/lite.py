@@ -0,0 +1,347 @@
+"""NumPy inference runtime for the per-symbol LSTM models.
+
+``export_lite`` writes a trained ``.keras`` model's weights and layer
+stack to an ``.npz`` next to it; ``LiteModel`` runs the same forward pass
+(LSTM, Dense, Dropout as identity) with NumPy alone, so serving a
+prediction needs neither TensorFlow nor Keras. Each LSTM layer projects
+every timestep's input in one matmul and only the recurrent term is
+stepped through time.
+
+Exports can store weights as float16, or as int8 with one float32 scale
+per output column (``MODEL_WEIGHT_PRECISION``). They stay in that form in
+memory, so each cached model takes half or about 1/3.6 of the RAM. Once a
+newer version is published, the artifact store drops the ``.keras`` source
+of versions whose reduced export passed ``export_checked``.
+
+``python -m src.ml.lite compare AAPL`` checks a symbol's exported model
+against Keras and reports per-call latency of both runtimes;
+``python -m src.ml.lite drift AAPL`` reports the prediction drift and size
+of float16 and int8 exports.
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "models"))
+SUPPORTED_LAYERS = ("LSTM", "Dense", "Dropout", "InputLayer")
+PRECISIONS = ("float32", "float16", "int8")
+
+
+def lite_path_for(keras_path: str) -> str:
+    return os.path.splitext(keras_path)[0] + ".npz"
+
+
+def is_current(keras_path: str, lite_path: str = None) -> bool:
+    """True when the export exists and is at least as new as its ``.keras`` source."""
+    lite_path = lite_path or lite_path_for(keras_path)
+    try:
+        return os.stat(lite_path).st_mtime_ns >= os.stat(keras_path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def _sigmoid(x):
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+_ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "tanh": np.tanh,
+    "sigmoid": _sigmoid,
+}
+
+
+def _quantize(weight: np.ndarray, precision: str):
+    """``(stored, scale)`` for one weight; ``scale`` is set only for int8 matrices."""
+    if precision == "float16":
+        return weight.astype(np.float16), None
+    if precision == "int8" and weight.ndim >= 2:
+        # Symmetric, one scale per output column; biases stay float32
+        scale = np.abs(weight).max(axis=tuple(range(weight.ndim - 1))) / 127.0
+        scale[scale == 0] = 1.0
+        return np.clip(np.round(weight / scale), -127, 127).astype(np.int8), scale.astype(np.float32)
+    return weight.astype(np.float32), None
+
+
+def default_precision() -> str:
+    precision = os.getenv("MODEL_WEIGHT_PRECISION", "float32")
+    if precision not in PRECISIONS:
+        raise ValueError(f"MODEL_WEIGHT_PRECISION must be one of: {', '.join(PRECISIONS)}")
+    return precision
+
+
+def export_model(model, lite_path: str, precision: str = "float32") -> str:
+    """Write an in-memory Keras model to ``lite_path``; returns the path."""
+    if precision not in PRECISIONS:
+        raise ValueError(f"precision must be one of: {', '.join(PRECISIONS)}")
+    spec, arrays = [], {}
+    for idx, layer in enumerate(model.layers):
+        kind = type(layer).__name__
+        if kind not in SUPPORTED_LAYERS:
+            raise ValueError(f"Layer type {kind} is not supported by the lite runtime")
+        if kind in ("Dropout", "InputLayer"):
+            continue
+        config = layer.get_config()
+        entry = {"kind": kind, "activation": config.get("activation", "linear"), "weights": [], "scales": []}
+        if kind == "LSTM":
+            entry["return_sequences"] = bool(config["return_sequences"])
+            entry["recurrent_activation"] = config.get("recurrent_activation", "sigmoid")
+        for w_idx, weight in enumerate(layer.get_weights()):
+            name = f"l{idx}_w{w_idx}"
+            arrays[name], scale = _quantize(weight, precision)
+            if scale is not None:
+                arrays[f"{name}_scale"] = scale
+            entry["weights"].append(name)
+            entry["scales"].append(f"{name}_scale" if scale is not None else None)
+        spec.append(entry)
+    tmp = lite_path + ".tmp.npz"
+    np.savez(tmp, __spec__=np.array(json.dumps(spec)), **arrays)
+    os.replace(tmp, lite_path)
+    return lite_path
+
+
+def export_lite(keras_path: str, lite_path: str = None, precision: str = None) -> str:
+    """Export a saved ``.keras`` model next to itself (``.npz``)."""
+    from tensorflow.keras.models import load_model
+
+    model = load_model(keras_path, compile=False)
+    return export_model(model, lite_path or lite_path_for(keras_path), precision or default_precision())
+
+
+def export_checked(keras_path: str, lite_path: str, precision: str = None, max_drift: float = None):
+    """Export at ``precision`` and measure drift against the full-precision model.
+
+    If the drift exceeds ``MODEL_MAX_WEIGHT_DRIFT`` (scaled output units), the
+    export is redone in float32. Returns ``(lite_path, report)``. The report
+    lists ``lite_bytes`` next to the full-precision ``keras_bytes``.
+    """
+    from tensorflow.keras.models import load_model
+
+    precision = precision or default_precision()
+    max_drift = max_drift if max_drift is not None else float(os.getenv("MODEL_MAX_WEIGHT_DRIFT", 0.01))
+    model = load_model(keras_path, compile=False)
+    export_model(model, lite_path, precision)
+    report = {"precision": precision}
+    if precision != "float32":
+        report = drift(lambda x: model(x, training=False).numpy(), LiteModel.load(lite_path), model.input_shape[1:])
+        if report["max_abs_drift"] > max_drift:
+            export_model(model, lite_path, "float32")
+            report["fallback"] = "float32"
+    report["lite_bytes"] = os.path.getsize(lite_path)
+    report["keras_bytes"] = os.path.getsize(keras_path)
+    return lite_path, report
+
+
+class LiteModel:
+    """Forward pass over weights kept as stored (float32, float16 or int8 plus scales).
+
+    Reduced-precision weights stay in that form in memory and are expanded to
+    float32 one layer at a time during ``predict``.
+    """
+
+    def __init__(self, spec, arrays, stacked: bool = False):
+        # Stacked models carry a leading model axis on every weight (see ``stack``)
+        self.stacked = stacked
+        self.layers = []
+        for entry in spec:
+            weights = [arrays[name] for name in entry["weights"]]
+            scales = [arrays[name] if name else None for name in entry.get("scales") or [None] * len(weights)]
+            self.layers.append((entry, weights, scales))
+
+    @classmethod
+    def load(cls, lite_path: str) -> "LiteModel":
+        with np.load(lite_path, allow_pickle=False) as data:
+            spec = json.loads(str(data["__spec__"]))
+            arrays = {k: data[k] for k in data.files if k != "__spec__"}
+        return cls(spec, arrays)
+
+    @property
+    def precision(self) -> str:
+        dtypes = {w.dtype.name for _, weights, _ in self.layers for w in weights if w.ndim >= 2}
+        return "int8" if "int8" in dtypes else "float16" if "float16" in dtypes else "float32"
+
+    def signature(self) -> tuple:
+        """Layer kinds, activations and weight shapes; equal signatures can be stacked."""
+        return tuple(
+            (entry["kind"], entry["activation"], entry.get("recurrent_activation"),
+             entry.get("return_sequences"), tuple((w.shape, w.dtype.str) for w in weights),
+             tuple(s is not None for s in scales))
+            for entry, weights, scales in self.layers
+        )
+
+    @classmethod
+    def stack(cls, models) -> "LiteModel":
+        """Run same-signature models side by side: input ``(K, batch, steps, f)``, model ``k`` on slice ``k``."""
+        if len({m.signature() for m in models}) != 1:
+            raise ValueError("Only models with identical layer stacks can be stacked")
+        spec, arrays = [], {}
+        for idx, (entry, weights, scales) in enumerate(models[0].layers):
+            names, scale_names = [], []
+            for w_idx in range(len(weights)):
+                name = f"l{idx}_w{w_idx}"
+                arrays[name] = np.stack([m.layers[idx][1][w_idx] for m in models])
+                names.append(name)
+                if scales[w_idx] is None:
+                    scale_names.append(None)
+                else:
+                    arrays[f"{name}_scale"] = np.stack([m.layers[idx][2][w_idx] for m in models])
+                    scale_names.append(f"{name}_scale")
+            spec.append({**entry, "weights": names, "scales": scale_names})
+        return cls(spec, arrays, stacked=True)
+
+    def get_weights(self):
+        """Weights (and int8 scales) as held in memory."""
+        return [a for _, weights, scales in self.layers for a in (*weights, *(s for s in scales if s is not None))]
+
+    def _expand(self, weight, scale):
+        if scale is None:
+            return weight.astype(np.float32, copy=False)
+        if self.stacked:
+            scale = scale.reshape(scale.shape[0], *([1] * (weight.ndim - scale.ndim)), scale.shape[-1])
+        return weight.astype(np.float32) * scale
+
+    def _w(self, weight, ndim):
+        # Insert broadcast axes after the model axis so it lines up with an ndim operand
+        if not self.stacked:
+            return weight
+        return weight.reshape(weight.shape[0], *([1] * (ndim - weight.ndim)), *weight.shape[1:])
+
+    @staticmethod
+    def _lstm(x, entry, kernel, recurrent, bias):
+        *lead, steps, _ = x.shape
+        units = recurrent.shape[-2]
+        act = _ACTIVATIONS[entry["activation"]]
+        rec_act = _ACTIVATIONS[entry["recurrent_activation"]]
+        # Input projection for every timestep at once; gates are ordered i, f, c, o
+        xw = x @ kernel + bias
+        h = np.zeros((*lead, units), dtype=np.float32)
+        c = np.zeros((*lead, units), dtype=np.float32)
+        seq = np.empty((*lead, steps, units), dtype=np.float32) if entry["return_sequences"] else None
+        for t in range(steps):
+            z = xw[..., t, :] + h @ recurrent
+            i = rec_act(z[..., :units])
+            f = rec_act(z[..., units:2 * units])
+            g = act(z[..., 2 * units:3 * units])
+            o = rec_act(z[..., 3 * units:])
+            c = f * c + i * g
+            h = o * act(c)
+            if seq is not None:
+                seq[..., t, :] = h
+        return seq if seq is not None else h
+
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        out = np.asarray(x, dtype=np.float32)
+        for entry, weights, scales in self.layers:
+            weights = [self._expand(w, sc) for w, sc in zip(weights, scales)]
+            if entry["kind"] == "LSTM":
+                kernel, recurrent, bias = weights
+                out = self._lstm(out, entry, self._w(kernel, out.ndim), self._w(recurrent, out.ndim - 1),
+                                 self._w(bias, out.ndim))
+            else:
+                out = out @ self._w(weights[0], out.ndim)
+                if len(weights) > 1:
+                    out = out + self._w(weights[1], out.ndim)
+                out = _ACTIVATIONS[entry["activation"]](out)
+        return out
+
+
+def _median_ms(fn, runs: int) -> float:
+    fn()  # warm-up
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return round(float(np.median(times)) * 1000, 3)
+
+
+def compare(keras_path: str, lite_path: str = None, batch: int = 1, runs: int = 50, seed: int = 0) -> dict:
+    """Max output difference and median per-call latency of Keras vs the lite runtime."""
+    from tensorflow.keras.models import load_model
+
+    lite_path = lite_path or lite_path_for(keras_path)
+    model = load_model(keras_path, compile=False)
+    lite = LiteModel.load(lite_path)
+    x = np.random.default_rng(seed).random((batch, *model.input_shape[1:]), dtype=np.float32)
+    expected = model(x, training=False).numpy()
+    got = lite.predict(x)
+    return {
+        "batch": batch,
+        "max_abs_diff": float(np.max(np.abs(expected - got))),
+        "keras_ms": _median_ms(lambda: model(x, training=False).numpy(), runs),
+        "keras_predict_ms": _median_ms(lambda: model.predict(x, verbose=0), max(1, runs // 5)),
+        "lite_ms": _median_ms(lambda: lite.predict(x), runs),
+    }
+
+
+def drift(reference, lite: "LiteModel", input_shape, batch: int = 256, seed: int = 0) -> dict:
+    """Output drift of ``lite`` against a full-precision ``reference`` callable, in scaled units."""
+    x = np.random.default_rng(seed).random((batch, *input_shape), dtype=np.float32)
+    diff = np.abs(np.asarray(reference(x), dtype=np.float32) - lite.predict(x))
+    stored = sum(a.nbytes for a in lite.get_weights())
+    full = sum(w.size * 4 for _, weights, _ in lite.layers for w in weights)
+    return {
+        "precision": lite.precision,
+        "max_abs_drift": float(diff.max()),
+        "mean_abs_drift": float(diff.mean()),
+        "weight_bytes": int(stored),
+        "float32_weight_bytes": int(full),
+        "compression": round(full / stored, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lite LSTM runtime tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    exp = sub.add_parser("export", help="Export a symbol's legacy _latest model to .npz")
+    exp.add_argument("symbol")
+    exp.add_argument("--precision", choices=PRECISIONS, default=None)
+    cmp_ = sub.add_parser("compare", help="Check parity and latency against Keras")
+    cmp_.add_argument("symbol")
+    cmp_.add_argument("--batch", type=int, nargs="+", default=[1, 32])
+    cmp_.add_argument("--runs", type=int, default=50)
+    dft = sub.add_parser("drift", help="Prediction drift and size of reduced-precision exports")
+    dft.add_argument("symbol")
+    dft.add_argument("--precision", choices=PRECISIONS, nargs="+", default=["float16", "int8"])
+    args = parser.parse_args(argv)
+
+    from src.ml.artifacts import artifact_store
+
+    published = artifact_store.latest(args.symbol)
+    if args.command == "export":
+        # Published versions already carry their export; this is for legacy _latest models
+        print(export_lite(os.path.join(MODELS_DIR, f"{args.symbol}_latest.keras"), precision=args.precision))
+        return
+    if published is not None:
+        keras_path, lite_path = published["model"], published.get("lite")
+    else:
+        keras_path, lite_path = os.path.join(MODELS_DIR, f"{args.symbol}_latest.keras"), None
+    if args.command == "drift":
+        import tempfile
+        import joblib
+        from tensorflow.keras.models import load_model
+
+        model = load_model(keras_path, compile=False)
+        tgt_path = published["tgt_scaler"] if published else None
+        price_range = float(joblib.load(tgt_path).data_range_[0]) if tgt_path else None
+        with tempfile.TemporaryDirectory() as tmp:
+            for precision in args.precision:
+                path = export_model(model, os.path.join(tmp, f"{precision}.npz"), precision)
+                report = drift(lambda x: model(x, training=False).numpy(), LiteModel.load(path),
+                               model.input_shape[1:])
+                report["file_bytes"] = os.path.getsize(path)
+                report["keras_bytes"] = os.path.getsize(keras_path)
+                if price_range is not None:
+                    # MinMax target: a scaled-unit error times the fitted range is a price error
+                    report["max_price_drift"] = report["max_abs_drift"] * price_range
+                print(json.dumps(report))
+        return
+    for batch in args.batch:
+        print(json.dumps(compare(keras_path, lite_path, batch=batch, runs=args.runs)))
+
+
+if __name__ == "__main__":
+    main()
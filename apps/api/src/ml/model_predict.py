@@ -2,15 +2,9 @@ import os
 import asyncio
 import pandas as pd
 import numpy as np
-import ta
 import shutil
 import joblib
-from datetime import datetime, timedelta
-
-from sklearn.preprocessing import MinMaxScaler
-from tensorflow.keras.models import Sequential, load_model
-from tensorflow.keras.layers import LSTM, Dense, Dropout, Input
-from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
+from concurrent.futures import ThreadPoolExecutor
 
 # Directory setup
 MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "models"))
@@ -22,52 +16,40 @@ os.makedirs(SCALERS_DIR, exist_ok=True)
 
 # ---- STOCK DATA FETCHING ----
 
-import httpx
+from src.services.bar_cache import get_history, iter_history_many
+from src.services.rate_limiter import Priority
+from src.ml.registry import registry
+from src.ml.lite import LiteModel, is_current, lite_path_for
+from src.ml.artifacts import artifact_store, publish_training_run
+from src.ml.prediction_cache import make_record, prediction_cache
+from src.ml.features import (
+    SEQ_LEN, bar_timestamps, feature_matrix, fit_scalers, sliding_windows, training_windows, window_dataset,
+)
+from src.ml.training_config import TrainingConfig, epoch_timer
+from src.services.indicators import indicator_engine
+
 async def get_data(symbol: str, period="1y", interval="1d") -> pd.DataFrame:
-    url = f"http://localhost:8080/api/v1/market/history/{symbol}"
-    params = {"period": period, "interval": interval}
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, params=params, timeout=30.0)
-        resp.raise_for_status()
-        df = pd.DataFrame(resp.json())
+    # Read through the shared bar cache instead of a loopback HTTP call
+    bars = await get_history(symbol, period, interval, priority=Priority.TRAINING)
+    df = pd.DataFrame({"Date": bars.dates(), **bars.columns})
     return df
 
 # ---- FEATURE ENGINEERING ----
 
-def add_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
-    df['Date'] = pd.to_datetime(df['Date'])
-    df.set_index('Date', inplace=True)
-    df['RSI_14'] = ta.momentum.RSIIndicator(df['Close'], window=14).rsi()
-    df['SMA_20'] = ta.trend.SMAIndicator(df['Close'], window=20).sma_indicator()
-    bb = ta.volatility.BollingerBands(df['Close'], window=20, window_dev=2)
-    df['BB_High'] = bb.bollinger_hband()
-    df['BB_Low'] = bb.bollinger_lband()
-    df.dropna(inplace=True)
-    print(df.head())
-    return df
-
-def preprocess(df: pd.DataFrame, seq_len=60):
-    df = add_technical_indicators(df)
-    feature_cols = ['Open','High','Low','Close','Volume','RSI_14','SMA_20','BB_High','BB_Low']
-    data = df[feature_cols].values
-    target = df['Close'].values.reshape(-1,1)
-    feat_scaler = MinMaxScaler()
-    tgt_scaler  = MinMaxScaler()
-    data_scaled   = feat_scaler.fit_transform(data)
-    target_scaled = tgt_scaler.fit_transform(target)
-    joblib.dump(feat_scaler, os.path.join(SCALERS_DIR, 'feat_scaler.gz'))
-    joblib.dump(tgt_scaler,  os.path.join(SCALERS_DIR, 'tgt_scaler.gz'))
-    X, y = [], []
-    for i in range(len(data_scaled) - seq_len):
-        X.append(data_scaled[i:i+seq_len])
-        y.append(target_scaled[i+seq_len])
-    X, y = np.array(X), np.array(y)
-    split_index = int(0.8 * len(X))
-    return X[:split_index], X[split_index:], y[:split_index], y[split_index:]
+def preprocess(df: pd.DataFrame, seq_len=SEQ_LEN):
+    """Train/validation windows plus the fitted ``(feat_scaler, tgt_scaler)`` pair."""
+    data, target = feature_matrix(df)
+    feat_scaler, tgt_scaler, data_scaled, target_scaled = fit_scalers(data, target)
+    X_train, X_test, y_train, y_test = training_windows(data_scaled, target_scaled, seq_len)
+    return X_train, X_test, y_train, y_test, (feat_scaler, tgt_scaler)
 
 # ---- MODEL ----
 
 def build_model(input_shape):
+    # TensorFlow is imported on first use so the API can start without it
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import LSTM, Dense, Dropout, Input
+
     model = Sequential([
         Input(shape=input_shape),
         LSTM(64, return_sequences=True),
@@ -80,118 +62,359 @@ def build_model(input_shape):
     model.compile(optimizer='adam', loss='huber')
     return model
 
-def _timestamp() -> str:
-    return datetime.now().strftime('%Y%m%d%H%M%S')
-
-def _version_artifacts(symbol: str, base_model_path: str):
-    ts = _timestamp()
-    # Model versions
-    ts_model = os.path.join(MODELS_DIR, f"{symbol}-{ts}.keras")
-    latest_model = os.path.join(MODELS_DIR, f"{symbol}_latest.keras")
-    shutil.copyfile(base_model_path, ts_model)
-    shutil.copyfile(base_model_path, latest_model)
-    # Scaler versions
-    feat_src = os.path.join(SCALERS_DIR, 'feat_scaler.gz')
-    tgt_src  = os.path.join(SCALERS_DIR, 'tgt_scaler.gz')
-    feat_ts = os.path.join(SCALERS_DIR, f"feat_scaler-{symbol}-{ts}.gz")
-    tgt_ts  = os.path.join(SCALERS_DIR, f"tgt_scaler-{symbol}-{ts}.gz")
-    feat_latest = os.path.join(SCALERS_DIR, f"feat_scaler-{symbol}_latest.gz")
-    tgt_latest  = os.path.join(SCALERS_DIR, f"tgt_scaler-{symbol}_latest.gz")
-    if os.path.exists(feat_src):
-        shutil.copyfile(feat_src, feat_ts)
-        shutil.copyfile(feat_src, feat_latest)
-    if os.path.exists(tgt_src):
-        shutil.copyfile(tgt_src, tgt_ts)
-        shutil.copyfile(tgt_src, tgt_latest)
-    return {
-        'model_ts': ts_model,
-        'model_latest': latest_model,
-        'feat_scaler_ts': feat_ts,
-        'feat_scaler_latest': feat_latest,
-        'tgt_scaler_ts': tgt_ts,
-        'tgt_scaler_latest': tgt_latest,
-    }
-
 def _latest_artifacts(symbol: str):
-    return {
+    published = artifact_store.latest(symbol)
+    if published is not None:
+        return published
+    # Bundles published before the artifact store
+    legacy = {
         'model': os.path.join(MODELS_DIR, f"{symbol}_latest.keras"),
         'feat_scaler': os.path.join(SCALERS_DIR, f"feat_scaler-{symbol}_latest.gz"),
         'tgt_scaler': os.path.join(SCALERS_DIR, f"tgt_scaler-{symbol}_latest.gz"),
     }
+    if is_current(legacy['model']):
+        legacy['lite'] = lite_path_for(legacy['model'])
+    return legacy
 
-def train_model(X_train, y_train, X_val, y_val, symbol):
-    model = build_model(X_train.shape[1:])
-    chkpt_path = os.path.join(MODELS_DIR, f"{symbol}_best.keras")
+def _fit(model, X_train, y_train, X_val, y_val, chkpt_path, callbacks, epochs, config, patience=10):
+    """``model.fit`` under ``config``; returns ``(history, timing)``."""
+    from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
+
+    timer = epoch_timer(len(X_train)) if config.epoch_timing else None
     callbacks = [
-        EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True),
-        ModelCheckpoint(chkpt_path, save_best_only=True, monitor='val_loss')
+        EarlyStopping(monitor='val_loss', patience=patience, restore_best_weights=True),
+        ModelCheckpoint(chkpt_path, save_best_only=True, monitor='val_loss'),
+        *([timer] if timer else []),
+        *(callbacks or []),
     ]
-    history = model.fit(
-        X_train, y_train,
-        validation_data=(X_val, y_val),
-        epochs=100,
-        batch_size=32,
-        callbacks=callbacks,
-        verbose=1
-    )
-    final_path = os.path.join(MODELS_DIR, f"{symbol}.keras")
-    model.save(final_path, include_optimizer=False)
-    versions = _version_artifacts(symbol, chkpt_path if os.path.exists(chkpt_path) else final_path)
-    return versions['model_latest'], versions['model_ts']
-
-def evaluate_and_predict(model_path, X_test, symbol):
-    model = load_model(model_path)
-    tgt_scaler = joblib.load(os.path.join(SCALERS_DIR, 'tgt_scaler.gz'))
-    last_seq = X_test[-1][None, ...]
-    pred_scaled = model.predict(last_seq)
-    pred_price  = tgt_scaler.inverse_transform(pred_scaled)[0,0]
-    print(f"Next-day predicted close price for {symbol}: {pred_price:.2f}")
-    return pred_price
+    if config.prefetch:
+        history = model.fit(
+            window_dataset(X_train, y_train, batch_size=config.batch_size),
+            validation_data=window_dataset(X_val, y_val, batch_size=config.batch_size, shuffle=False),
+            epochs=epochs, callbacks=callbacks, verbose=1
+        )
+    else:
+        history = model.fit(
+            X_train, y_train, batch_size=config.batch_size, shuffle=True,
+            validation_data=(X_val, y_val), epochs=epochs, callbacks=callbacks, verbose=1
+        )
+    return history, (timer.summary() if timer else {})
+
+def _publish(model, history, chkpt_path, workdir, symbol, scalers, meta):
+    if not os.path.exists(chkpt_path):
+        model.save(chkpt_path, include_optimizer=False)
+    val_losses = history.history.get('val_loss') or [None]
+    meta = {
+        'epochs_run': len(history.history.get('loss', [])),
+        'best_val_loss': min((v for v in val_losses if v is not None), default=None),
+        **meta,
+    }
+    feat_scaler, tgt_scaler = scalers
+    version = publish_training_run(symbol, chkpt_path, feat_scaler, tgt_scaler, workdir, meta)
+    registry.invalidate(symbol)
+    return artifact_store.latest(symbol)['model'], version
+
+def train_model(X_train, y_train, X_val, y_val, symbol, scalers, extra_callbacks=None, epochs=100, meta=None,
+                config=None):
+    """Fit, then publish model, lite export and scalers as the symbol's latest version.
+
+    Returns ``(model_path, version)`` of the published bundle.
+    """
+    config = config or TrainingConfig()
+    model = build_model(X_train.shape[1:])
+    # Each run writes to its own scratch dir, so concurrent runs never share files
+    workdir = artifact_store.workdir()
+    chkpt_path = os.path.join(workdir, "best.keras")
+    try:
+        history, timing = _fit(model, X_train, y_train, X_val, y_val, chkpt_path, extra_callbacks, epochs, config)
+        return _publish(model, history, chkpt_path, workdir, symbol, scalers, {
+            'mode': 'full',
+            'train_samples': int(len(X_train)),
+            'val_samples': int(len(X_val)),
+            'timing': timing,
+            'config': config.to_dict(),
+            **(meta or {}),
+        })
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+# ---- INCREMENTAL FINE-TUNING ----
+
+class FullRetrainRequired(Exception):
+    """Warm-starting is not possible or did not help; ``reason`` says why."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+def data_end(df: pd.DataFrame) -> int:
+    """Epoch seconds of the last bar in a ``get_data`` frame."""
+    return int(bar_timestamps(df['Date'].iloc[-1:])[0])
+
+def fine_tune(df: pd.DataFrame, symbol: str, extra_callbacks=None, seq_len=SEQ_LEN, config=None):
+    """Warm-start the published model on bars newer than it plus a replay sample.
+
+    The published scalers are reused and validation uses the same chronological
+    holdout as a full training. Raises ``FullRetrainRequired`` when there is no
+    usable base version, too many new bars, new closes outside the scaler range,
+    or when fine-tuning leaves the validation loss worse than before.
+    Returns ``(model_path, version, info)``; ``version`` is unchanged when no
+    bar is newer than the published model.
+    """
+    from tensorflow.keras.models import load_model
+    from tensorflow.keras.optimizers import Adam
+
+    config = config or TrainingConfig()
+    max_new = int(os.getenv("INCREMENTAL_MAX_NEW_BARS", 30))
+    replay_ratio = float(os.getenv("INCREMENTAL_REPLAY_RATIO", 4))
+    replay_min = int(os.getenv("INCREMENTAL_REPLAY_MIN", 64))
+    margin = float(os.getenv("INCREMENTAL_SCALER_MARGIN", 0.1))
+    tolerance = float(os.getenv("INCREMENTAL_VAL_TOLERANCE", 0.0))
+
+    base = artifact_store.latest(symbol)
+    base_meta = artifact_store.meta(symbol)
+    if base is None or base_meta is None:
+        raise FullRetrainRequired("no published model")
+    if base_meta.get('data_end') is None:
+        raise FullRetrainRequired("published model does not record its last bar")
+
+    data, target, ts = feature_matrix(df.copy(), return_ts=True)
+    new_rows = int(np.count_nonzero(ts > base_meta['data_end']))
+    info = {'mode': 'incremental', 'base_version': base_meta['version'], 'new_bars': new_rows}
+    if new_rows == 0:
+        return base['model'], base_meta['version'], {**info, 'up_to_date': True}
+    if new_rows > max_new:
+        raise FullRetrainRequired(f"{new_rows} new bars exceed INCREMENTAL_MAX_NEW_BARS ({max_new})")
+
+    feat_scaler, tgt_scaler = joblib.load(base['feat_scaler']), joblib.load(base['tgt_scaler'])
+    data_scaled = feat_scaler.transform(data).astype(np.float32, copy=False)
+    target_scaled = tgt_scaler.transform(target).astype(np.float32, copy=False)
+    # The target scaler bounds what the output layer can express; indicators may drift further
+    fresh = target_scaled[-new_rows:]
+    if fresh.min() < -margin or fresh.max() > 1 + margin:
+        raise FullRetrainRequired("new closes fall outside the published scaler range")
+
+    X = sliding_windows(data_scaled[:-1], seq_len)
+    y = target_scaled[seq_len:]
+    n_new = min(new_rows, len(X))
+    # Validation is the chronological holdout of the data the base model saw
+    split = int(0.8 * (len(X) - n_new))
+    if split <= 0:
+        raise FullRetrainRequired("not enough history for a replay sample")
+    X_val, y_val = X[split:len(X) - n_new], y[split:len(X) - n_new]
+    n_replay = min(split, max(replay_min, int(replay_ratio * n_new)))
+    replay = np.sort(np.random.default_rng().choice(split, size=n_replay, replace=False))
+    idx = np.concatenate([replay, np.arange(len(X) - n_new, len(X))])
+    X_train, y_train = X[idx], y[idx]
+
+    model = load_model(base['model'], compile=False)
+    model.compile(optimizer=Adam(learning_rate=float(os.getenv("INCREMENTAL_LEARNING_RATE", 1e-4))), loss='huber')
+    baseline = float(model.evaluate(
+        window_dataset(X_val, y_val, batch_size=config.batch_size, shuffle=False), verbose=0
+    ))
+
+    workdir = artifact_store.workdir()
+    chkpt_path = os.path.join(workdir, "best.keras")
+    try:
+        history, timing = _fit(
+            model, X_train, y_train, X_val, y_val, chkpt_path, extra_callbacks,
+            epochs=int(os.getenv("INCREMENTAL_EPOCHS", 10)), config=config, patience=3,
+        )
+        best = min(history.history.get('val_loss') or [float('inf')])
+        info.update(baseline_val_loss=baseline, replay_samples=int(n_replay))
+        if best > baseline * (1 + tolerance):
+            raise FullRetrainRequired(f"validation loss rose from {baseline:.6g} to {best:.6g}")
+        model_path, version = _publish(model, history, chkpt_path, workdir, symbol, (feat_scaler, tgt_scaler), {
+            **info,
+            'train_samples': int(len(X_train)),
+            'val_samples': int(len(X_val)),
+            'data_end': int(ts[-1]),
+            'timing': timing,
+            'config': config.to_dict(),
+        })
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return model_path, version, info
+
+def train_incremental(df: pd.DataFrame, symbol: str, extra_callbacks=None, epochs=100, on_fallback=None,
+                      config=None):
+    """Fine-tune when possible, otherwise run a full training; returns ``(model_path, version, info)``."""
+    try:
+        return fine_tune(df, symbol, extra_callbacks, config=config)
+    except FullRetrainRequired as e:
+        print(f"Full retrain for {symbol}: {e.reason}")
+        if on_fallback is not None:
+            on_fallback(e.reason)
+        end = data_end(df)
+        X_train, X_test, y_train, y_test, scalers = preprocess(df)
+        model_path, version = train_model(
+            X_train, y_train, X_test, y_test, symbol, scalers,
+            extra_callbacks=extra_callbacks, epochs=epochs, meta={'data_end': end}, config=config,
+        )
+        return model_path, version, {'mode': 'full', 'fallback_reason': e.reason}
 
 # ---- PREDICT-ONLY (no retrain) ----
 
-def _build_features_only(df: pd.DataFrame) -> pd.DataFrame:
-    df = add_technical_indicators(df)
-    return df[['Open','High','Low','Close','Volume','RSI_14','SMA_20','BB_High','BB_Low']]
+def has_latest_artifacts(symbol: str) -> bool:
+    return all(os.path.exists(p) for p in _latest_artifacts(symbol).values())
+
+def model_version(symbol: str, artifacts: dict = None) -> str:
+    """Published version id, or an mtime tag for legacy ``_latest`` bundles."""
+    version = artifact_store.latest_version(symbol)
+    if version is not None:
+        return version
+    artifacts = artifacts or _latest_artifacts(symbol)
+    return f"legacy-{os.stat(artifacts['model']).st_mtime_ns}"
 
-async def predict_only(symbol: str, seq_len: int = 60):
+def _predict_window(symbol: str, artifacts: dict, window: np.ndarray):
+    # Loaded once per published version, then served from the registry cache
+    bundle = registry.get(symbol, artifacts)
+    window = bundle.feat_scaler.transform(window[0]).astype(np.float32, copy=False)[None, ...]
+    pred_scaled = bundle.predict(window)
+    return float(bundle.tgt_scaler.inverse_transform(pred_scaled)[0, 0]), bundle.runtime
+
+async def predict_latest(symbol: str, seq_len: int = SEQ_LEN, priority: Priority = Priority.HISTORY):
+    """Return ``(record, cached)`` for the next-bar prediction of ``symbol``.
+
+    Keyed by (symbol, model version, last bar); only a new bar or a newly
+    published model triggers a forward pass.
+    """
     artifacts = _latest_artifacts(symbol)
-    model_path = artifacts['model']
-    feat_scaler_path = artifacts['feat_scaler']
-    tgt_scaler_path  = artifacts['tgt_scaler']
-    if not (os.path.exists(model_path) and os.path.exists(feat_scaler_path) and os.path.exists(tgt_scaler_path)):
+    if not all(os.path.exists(p) for p in artifacts.values()):
         raise FileNotFoundError("Latest artifacts not found. Train the model first.")
+    version = model_version(symbol, artifacts)
 
-    df = await get_data(symbol)
-    feat_df = _build_features_only(df)
-    if len(feat_df) < seq_len + 1:
+    # The cache read refreshes the tail; features come from the engine's precomputed rows
+    bars = await get_history(symbol, "1y", "1d", priority=priority)
+    state = indicator_engine.track(symbol, bars.td_interval, bars)
+    if state.last_ts is None:
         raise ValueError("Not enough data for prediction window.")
 
-    feat_scaler = joblib.load(feat_scaler_path)
-    tgt_scaler  = joblib.load(tgt_scaler_path)
-
-    data_scaled = feat_scaler.transform(feat_df.values)
-    X = []
-    for i in range(len(data_scaled) - seq_len):
-        X.append(data_scaled[i:i+seq_len])
-    X = np.array(X)
-    model = load_model(model_path)
-    last_seq = X[-1][None, ...]
-    pred_scaled = model.predict(last_seq)
-    pred_price  = tgt_scaler.inverse_transform(pred_scaled)[0,0]
-    print(f"Next-day predicted close price (no retrain) for {symbol}: {pred_price:.2f}")
-    return pred_price
-
-# ---- END-TO-END ORCHESTRATOR ----
-
-async def predict_stock(symbol: str):
-    end_date = datetime.today().date()
-    start_date = end_date - timedelta(days=370)
+    async def compute():
+        window = indicator_engine.window(symbol, bars.td_interval, bars, seq_len)[None, ...]
+        pred_price, runtime = await asyncio.to_thread(_predict_window, symbol, artifacts, window)
+        print(f"Next-day predicted close price (no retrain) for {symbol}: {pred_price:.2f}")
+        return make_record(symbol, pred_price, version, state.last_ts, bars.td_interval, runtime)
+
+    return await prediction_cache.get_or_compute((symbol.upper(), version, state.last_ts), compute)
+
+def _predict_batch(items):
+    """Forward passes for ``[(symbol, artifacts, window)]``; returns ``(price, runtime)`` or an exception each.
+
+    Lite models with the same layer stack run as one stacked forward pass;
+    Keras models run one call each.
+    """
+    results = [None] * len(items)
+    groups = {}
+    for idx, (symbol, artifacts, window) in enumerate(items):
+        try:
+            bundle = registry.get(symbol, artifacts)
+            scaled = bundle.feat_scaler.transform(window[0]).astype(np.float32, copy=False)[None, ...]
+        except Exception as e:
+            results[idx] = e
+            continue
+        key = bundle.model.signature() if bundle.runtime == "lite" else ("keras", idx)
+        groups.setdefault(key, []).append((idx, bundle, scaled))
+    for members in groups.values():
+        try:
+            if len(members) > 1:
+                stacked = LiteModel.stack([bundle.model for _, bundle, _ in members])
+                outputs = stacked.predict(np.stack([scaled for _, _, scaled in members]))
+            else:
+                outputs = [members[0][1].predict(members[0][2])]
+            for (idx, bundle, _), pred_scaled in zip(members, outputs):
+                results[idx] = (float(bundle.tgt_scaler.inverse_transform(pred_scaled)[0, 0]), bundle.runtime)
+        except Exception as e:
+            for idx, _, _ in members:
+                results[idx] = e
+    return results
+
+_batch_pool = None
+
+def _batch_executor():
+    global _batch_pool
+    if _batch_pool is None:
+        _batch_pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv("PREDICT_BATCH_WORKERS", 2)), thread_name_prefix="predict-batch"
+        )
+    return _batch_pool
+
+async def predict_many(symbols, seq_len: int = SEQ_LEN, priority: Priority = Priority.HISTORY):
+    """``{symbol: (record, cached) or exception}`` for several symbols at once.
+
+    Bars for every symbol are fetched concurrently on the ``priority`` lane
+    (precompute passes ``BACKGROUND``). Cached predictions are
+    returned as is. The remaining windows are split into chunks of
+    ``PREDICT_BATCH_SIZE`` and run on a bounded thread pool, with each chunk's
+    same-shaped lite models stacked into one forward pass.
+    """
+    results, pending = {}, {}
+    for symbol in symbols:
+        artifacts = _latest_artifacts(symbol)
+        if not all(os.path.exists(p) for p in artifacts.values()):
+            results[symbol] = FileNotFoundError("Latest artifacts not found. Train the model first.")
+        else:
+            pending[symbol] = (artifacts, model_version(symbol, artifacts))
+
+    items, keys = [], []
+    async for symbol, bars in iter_history_many(list(pending), "1y", "1d", priority=priority):
+        if isinstance(bars, Exception):
+            results[symbol] = bars
+            continue
+        state = indicator_engine.track(symbol, bars.td_interval, bars)
+        if state.last_ts is None:
+            results[symbol] = ValueError("Not enough data for prediction window.")
+            continue
+        artifacts, version = pending[symbol]
+        key = (symbol.upper(), version, state.last_ts)
+        record = prediction_cache.peek(key)
+        if record is not None:
+            results[symbol] = (record, True)
+            continue
+        try:
+            window = indicator_engine.window(symbol, bars.td_interval, bars, seq_len)[None, ...]
+        except ValueError as e:
+            results[symbol] = e
+            continue
+        items.append((symbol, artifacts, window))
+        keys.append((key, version, state.last_ts, bars.td_interval))
+
+    size = int(os.getenv("PREDICT_BATCH_SIZE", 32))
+    loop = asyncio.get_running_loop()
+    chunks = [range(lo, min(lo + size, len(items))) for lo in range(0, len(items), size)]
+    outputs = await asyncio.gather(*(
+        loop.run_in_executor(_batch_executor(), _predict_batch, [items[i] for i in chunk]) for chunk in chunks
+    ))
+    for chunk, chunk_out in zip(chunks, outputs):
+        for i, out in zip(chunk, chunk_out):
+            symbol = items[i][0]
+            if isinstance(out, Exception):
+                results[symbol] = out
+                continue
+            key, version, last_ts, interval = keys[i]
+            record = make_record(symbol, out[0], version, last_ts, interval, out[1])
+            results[symbol] = (prediction_cache.put(key, record), False)
+    return results
+
+async def predict_only(symbol: str, seq_len: int = SEQ_LEN):
+    """Inference only: one data fetch, one window, the latest published model."""
+    record, _ = await predict_latest(symbol, seq_len)
+    return record["prediction"]
+
+# ---- RETRAINING (explicit) ----
+
+async def retrain(symbol: str):
+    """Fit a new model and publish it as the symbol's latest artifacts."""
     df = await get_data(symbol)
-    X_train, X_test, y_train, y_test = preprocess(df)
-    final_model, best_model = train_model(X_train, y_train, X_test, y_test, symbol)
-    return evaluate_and_predict(best_model, X_test, symbol)
+    end = data_end(df)
+    X_train, X_test, y_train, y_test, scalers = preprocess(df)
+    return train_model(X_train, y_train, X_test, y_test, symbol, scalers, meta={'data_end': end})
 
 if __name__ == "__main__":
     symbol = input("Enter stock symbol: ").strip().upper()
-    price = asyncio.run(predict_stock(symbol))
+
+    async def main():
+        await retrain(symbol)
+        return await predict_only(symbol)
+
+    price = asyncio.run(main())
@@ -1,113 +1,30 @@
-import os
-import asyncio
-import httpx
-import pandas as pd
-import numpy as np
-import ta
-import joblib
-
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.model_selection import train_test_split
-from tensorflow.keras.models import Sequential, load_model
-from tensorflow.keras.layers import LSTM, Dense, Dropout
-from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
-
-# Directory setup
-MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "models"))
-SCALERS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "scalers"))
-os.makedirs(MODELS_DIR, exist_ok=True)
-os.makedirs(SCALERS_DIR, exist_ok=True)
+"""Train and publish a symbol's model from the command line.
 
-# 1. Fetch Data
-async def get_data(symbol: str, period="1y", interval="1d") -> pd.DataFrame:
-    url = f"http://localhost:8080/api/v1/market/history/{symbol}"
-    params = {"period": period, "interval": interval}
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, params=params, timeout=30.0)
-        resp.raise_for_status()
-        df = pd.DataFrame(resp.json())
-    return df
-
-# 2. Feature Engineering & Preprocessing
-def add_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
-    # Ensure datetime index
-    df['Date'] = pd.to_datetime(df['Date'])
-    df.set_index('Date', inplace=True)
-    # Technical Indicators
-    df['RSI_14'] = ta.momentum.RSIIndicator(df['Close'], window=14).rsi()
-    df['SMA_20'] = ta.trend.SMAIndicator(df['Close'], window=20).sma_indicator()
-    df['BB_High'], df['BB_Low'] = (
-        ta.volatility.BollingerBands(df['Close'], window=20, window_dev=2).bollinger_hband(),
-        ta.volatility.BollingerBands(df['Close'], window=20, window_dev=2).bollinger_lband()
-    )
-    df.dropna(inplace=True)
-    return df
+Data fetching, preprocessing, the model and publishing all live in
+``model_predict``; this script only applies the ``TrainingConfig`` (threads,
+batch size, prefetch, seeds) for its own process and runs one full training.
+"""
+import asyncio
+from src.ml.training_config import TrainingConfig
 
-def preprocess(df: pd.DataFrame, seq_len=60):
-    df = add_technical_indicators(df)
-    # Features and target
-    feature_cols = ['Open','High','Low','Close','Volume','RSI_14','SMA_20','BB_High','BB_Low']
-    data = df[feature_cols].values
-    target = df['Close'].values.reshape(-1,1)
-    # Scale features and target separately
-    feat_scaler = MinMaxScaler()
-    tgt_scaler  = MinMaxScaler()
-    data_scaled   = feat_scaler.fit_transform(data)
-    target_scaled = tgt_scaler.fit_transform(target)
-    # Save scalers
-    joblib.dump(feat_scaler, os.path.join(SCALERS_DIR, 'feat_scaler.gz'))
-    joblib.dump(tgt_scaler,  os.path.join(SCALERS_DIR, 'tgt_scaler.gz'))
-    # Build sequences
-    X, y = [], []
-    for i in range(len(data_scaled) - seq_len):
-        X.append(data_scaled[i:i+seq_len])
-        y.append(target_scaled[i+seq_len])
-    X, y = np.array(X), np.array(y)
-    # Time-series split
-    split_index = int(0.8 * len(X))
-    return X[:split_index], X[split_index:], y[:split_index], y[split_index:]
 
-# 3. Model Creation & Training
-def build_model(input_shape):
-    model = Sequential([
-        LSTM(64, return_sequences=True, input_shape=input_shape),
-        Dropout(0.2),
-        LSTM(64),
-        Dropout(0.2),
-        Dense(32, activation='relu'),
-        Dense(1)
-    ])
-    model.compile(optimizer='adam', loss='huber')
-    return model
+async def train(symbol: str, config: TrainingConfig = None):
+    from src.ml import model_predict
 
-def train_model(X_train, y_train, X_val, y_val, symbol):
-    model = build_model(X_train.shape[1:])
-    # Callbacks
-    chkpt_path = os.path.join(MODELS_DIR, f"{symbol}_best.keras")
-    callbacks = [
-        EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True),
-        ModelCheckpoint(chkpt_path, save_best_only=True, monitor='val_loss')
-    ]
-    history = model.fit(
-        X_train, y_train,
-        validation_data=(X_val, y_val),
-        epochs=100,
-        batch_size=32,
-        callbacks=callbacks,
-        verbose=1
+    df = await model_predict.get_data(symbol)
+    # Recorded so later incremental runs know which bars the model has seen
+    end = model_predict.data_end(df)
+    X_train, X_test, y_train, y_test, scalers = model_predict.preprocess(df)
+    model_path, version = model_predict.train_model(
+        X_train, y_train, X_test, y_test, symbol, scalers, meta={'data_end': end}, config=config
     )
-    # Save final model
-    final_path = os.path.join(MODELS_DIR, f"{symbol}.keras")
-    model.save(final_path, include_optimizer=False)
-    print(f"Model saved to {final_path}")
-    return chkpt_path
+    print(f"Published {symbol} model version {version}")
+    return model_path
 
-async def train(symbol: str):
-    df = await get_data(symbol)
-    X_train,X_test,y_train,y_test = preprocess(df)
-    best_model = train_model(X_train, y_train, X_test, y_test, symbol)
-    return best_model
 
 if __name__ == "__main__":
     symbol = input("Enter stock symbol: ").strip().upper()
-    price = asyncio.run(train(symbol))
+    config = TrainingConfig()
+    # Thread settings only take effect before TensorFlow starts
+    config.apply()
+    asyncio.run(train(symbol, config))
@@ -0,0 +1,223 @@
+"""Scheduled pre-computation of predictions for watchlisted symbols.
+
+After each US market close (by default 16:15 New York time, Monday to
+Friday) the scheduler collects the distinct symbols on every user's
+watchlist. It then works through them in batches of
+``PRECOMPUTE_BATCH_SIZE``. Each batch's daily bars are fetched together on
+the background rate-limiter lane, ``PRECOMPUTE_CONCURRENCY`` symbols at a
+time. The batch then goes through ``predict_many``, which runs inference on
+the bounded batch pool, and every result lands in the prediction cache. A
+user's ``/predict`` call for a watched symbol is then a cache hit until the
+next bar arrives.
+
+``PRECOMPUTE_SCHEDULE`` accepts a five-field cron expression (minute,
+hour, day of month, month, day of week), evaluated in ``PRECOMPUTE_TZ``, or
+``off``. Symbols without a trained model are skipped, not failed. Each run
+records its duration, symbols per second and per-symbol failures.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from src.services.bar_cache import iter_history_many
+from src.services.rate_limiter import Priority
+from src.ml.warmup import ml_warmup
+
+logger = logging.getLogger(__name__)
+
+# 15 minutes after the NYSE close, on weekdays
+DEFAULT_SCHEDULE = "15 16 * * 1-5"
+
+
+class CronSchedule:
+    """Minimal five-field cron matcher: ``*``, ``a-b``, ``a,b`` and ``/step``."""
+
+    RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expr: str):
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got '{expr}'")
+        self.expr = expr
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse(field, lo, hi) for field, (lo, hi) in zip(fields, self.RANGES)
+        )
+        self.weekdays = {d % 7 for d in weekdays}  # 7 is also Sunday
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse(field: str, lo: int, hi: int) -> set:
+        values = set()
+        for part in field.split(","):
+            rng, _, step = part.partition("/")
+            if rng == "*":
+                start, end = lo, hi
+            elif "-" in rng:
+                start, end = (int(v) for v in rng.split("-", 1))
+            else:
+                start = int(rng)
+                end = hi if step else start
+            if start < lo or end > hi or start > end:
+                raise ValueError(f"Cron field '{field}' is not a valid range within {lo}-{hi}")
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return values
+
+    def _day_matches(self, dt: datetime) -> bool:
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.weekday() + 1) % 7 in self.weekdays
+        # Standard cron: when both day fields are restricted, either may match
+        if not self.any_day and not self.any_weekday:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, now: datetime) -> datetime:
+        dt = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 4)
+        while dt < limit:
+            if dt.month not in self.months or not self._day_matches(dt):
+                dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+            elif dt.hour not in self.hours:
+                dt = (dt + timedelta(hours=1)).replace(minute=0)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt
+        raise ValueError(f"Cron expression '{self.expr}' never fires")
+
+
+class PredictionPrecompute:
+    def __init__(self, schedule: str = None, batch_size: int = None, concurrency: int = None):
+        self.schedule_expr = schedule or os.getenv("PRECOMPUTE_SCHEDULE", DEFAULT_SCHEDULE)
+        self.tz = ZoneInfo(os.getenv("PRECOMPUTE_TZ", "America/New_York"))
+        self.batch_size = batch_size or int(os.getenv("PRECOMPUTE_BATCH_SIZE", 16))
+        self.concurrency = concurrency or int(os.getenv("PRECOMPUTE_CONCURRENCY", 4))
+        self.schedule = None if self.schedule_expr == "off" else CronSchedule(self.schedule_expr)
+        self.runs = deque(maxlen=int(os.getenv("PRECOMPUTE_RUN_HISTORY", 20)))
+        self.next_run = None
+        self._current = None
+        self._current_run = None
+        self._loop_task = None
+        self._prisma = None
+
+    def start(self):
+        """Start the schedule loop; call from app startup."""
+        if self.schedule is None:
+            return
+        if not os.getenv("DIRECT_URL"):
+            logger.warning("No database URL configured - prediction pre-compute is disabled")
+            return
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._loop())
+
+    async def shutdown(self):
+        for task in (self._loop_task, self._current):
+            if task is not None:
+                task.cancel()
+        self._loop_task = None
+
+    async def _loop(self):
+        while True:
+            self.next_run = self.schedule.next_after(datetime.now(self.tz))
+            await asyncio.sleep(max(0.0, (self.next_run - datetime.now(self.tz)).total_seconds()))
+            try:
+                await self.trigger("schedule")
+            except Exception as e:
+                logger.error(f"Scheduled prediction pre-compute failed: {e}")
+
+    def trigger(self, reason: str = "manual") -> asyncio.Task:
+        """Start a run unless one is in progress; returns the run's task."""
+        if self._current is None or self._current.done():
+            self._current_run = {
+                "id": uuid.uuid4().hex,
+                "trigger": reason,
+                "status": "running",
+                "started_at": time.time(),
+                "symbols": 0,
+                "predicted": 0,
+                "already_cached": 0,
+                "skipped_untrained": [],
+                "failures": [],
+            }
+            self._current = asyncio.create_task(self._run(self._current_run))
+        return self._current
+
+    @property
+    def running(self) -> dict:
+        return self._current_run if self._current is not None and not self._current.done() else None
+
+    async def _db(self):
+        if self._prisma is None:
+            from prisma import Prisma
+            self._prisma = Prisma()
+        if not self._prisma.is_connected():
+            await self._prisma.connect()
+        return self._prisma
+
+    async def watched_symbols(self) -> list:
+        db = await self._db()
+        rows = await db.watchlist.find_many(distinct=["stockSymbol"])
+        return sorted({row.stockSymbol for row in rows})
+
+    async def _run(self, run: dict) -> dict:
+        started = time.perf_counter()
+        try:
+            symbols = await self.watched_symbols()
+            model_predict = await ml_warmup.model_predict()
+            trained = []
+            for symbol in symbols:
+                if model_predict.has_latest_artifacts(symbol):
+                    trained.append(symbol)
+                else:
+                    run["skipped_untrained"].append(symbol)
+            run["symbols"] = len(symbols)
+            for lo in range(0, len(trained), self.batch_size):
+                # One bulk bar fetch per batch; inference then reads the warm bar cache
+                ready = []
+                async for symbol, result in iter_history_many(
+                    trained[lo:lo + self.batch_size], "1y", "1d", self.concurrency, Priority.BACKGROUND
+                ):
+                    if isinstance(result, Exception):
+                        run["failures"].append({"symbol": symbol, "stage": "fetch", "error": str(result)})
+                    else:
+                        ready.append(symbol)
+                results = await model_predict.predict_many(ready, priority=Priority.BACKGROUND) if ready else {}
+                for symbol, result in results.items():
+                    if isinstance(result, Exception):
+                        run["failures"].append({"symbol": symbol, "stage": "predict", "error": str(result)})
+                    else:
+                        run["already_cached" if result[1] else "predicted"] += 1
+            run["status"] = "completed"
+        except asyncio.CancelledError:
+            run["status"] = "cancelled"
+            raise
+        except Exception as e:
+            run.update(status="failed", error=str(e))
+            logger.error(f"Prediction pre-compute run failed: {e}")
+        finally:
+            duration = time.perf_counter() - started
+            done = run["predicted"] + run["already_cached"]
+            run["duration_seconds"] = round(duration, 3)
+            run["symbols_per_second"] = round(done / duration, 3) if duration > 0 else None
+            run["finished_at"] = time.time()
+            self.runs.appendleft(run)
+        return run
+
+    def stats(self) -> dict:
+        return {
+            "schedule": self.schedule_expr,
+            "timezone": str(self.tz),
+            "enabled": self._loop_task is not None,
+            "next_run": self.next_run.isoformat() if self.next_run else None,
+            "batch_size": self.batch_size,
+            "concurrency": self.concurrency,
+            "running": self.running,
+            "runs": list(self.runs),
+        }
+
+
+prediction_precompute = PredictionPrecompute()
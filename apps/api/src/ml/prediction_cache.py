@@ -0,0 +1,163 @@
+"""Cache of next-bar predictions, persisted to the ``Prediction`` table.
+
+A prediction only changes when a new model version is published or a new
+bar arrives. Results are therefore kept in memory under
+``(symbol, model version, last input bar timestamp)``, and repeat requests
+within the same bar are answered from memory. Concurrent misses for one
+key share a single computation. Every computed prediction is also written
+to Postgres in the background, so ``/predictions/history`` can query past
+predictions. Without ``DIRECT_URL`` the cache works in memory only.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from src.services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "lstm"
+PREDICTION_TYPE = "next_close"
+
+
+class PredictionCache:
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or int(os.getenv("PREDICTION_CACHE_SIZE", 1024))
+        self._entries = OrderedDict()
+        self._flights = SingleFlight()
+        self._writes = set()
+        self._prisma = None
+        self.hits = 0
+        self.misses = 0
+        self.persisted = 0
+        self.persist_failures = 0
+
+    async def get_or_compute(self, key, compute):
+        """Return ``(record, cached)`` for ``key``, running ``compute()`` once on a miss.
+
+        ``key`` is ``(symbol, model_version, bar_ts)`` and ``compute`` returns a record dict.
+        """
+        record = self._entries.get(key)
+        if record is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return record, True
+
+        async def run():
+            return self.put(key, await compute())
+
+        self.misses += 1
+        return await self._flights.do(key, run), False
+
+    def peek(self, key):
+        """Cached record for ``key``, or ``None``; counted like a lookup in ``get_or_compute``."""
+        record = self._entries.get(key)
+        if record is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return record
+
+    def put(self, key, record):
+        """Store a record computed outside ``get_or_compute`` (e.g. in a batch) and persist it."""
+        self._entries[key] = record
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._persist_later(record)
+        return record
+
+    async def _db(self):
+        if self._prisma is None:
+            from prisma import Prisma
+            self._prisma = Prisma()
+        if not self._prisma.is_connected():
+            await self._prisma.connect()
+        return self._prisma
+
+    def _persist_later(self, record):
+        if not os.getenv("DIRECT_URL"):
+            return
+        task = asyncio.create_task(self._persist(record))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def _persist(self, record):
+        from prisma import Json
+
+        try:
+            db = await self._db()
+            symbol = record["symbol"]
+            # Ensure Stock exists to satisfy the FK constraint
+            await db.stock.upsert(
+                where={"symbol": symbol},
+                data={"create": {"symbol": symbol, "name": symbol}, "update": {}},
+            )
+            await db.prediction.create(data={
+                "stockSymbol": symbol,
+                "modelName": f"{MODEL_NAME}:{record['model_version']}",
+                "predictionType": PREDICTION_TYPE,
+                "predictedValue": record["prediction"],
+                "confidence": 0.0,  # the model does not estimate one
+                "horizon": record["interval"],
+                "features": Json({
+                    "model_version": record["model_version"],
+                    "bar_ts": record["bar_ts"],
+                    "as_of": record["as_of"],
+                    "runtime": record.get("runtime"),
+                }),
+            })
+            self.persisted += 1
+        except Exception as e:
+            self.persist_failures += 1
+            logger.warning(f"Failed to persist prediction for {record.get('symbol')}: {e}")
+
+    async def history(self, symbol: str, limit: int = 50):
+        """Stored predictions for ``symbol``, newest first."""
+        db = await self._db()
+        rows = await db.prediction.find_many(
+            where={"stockSymbol": symbol.upper(), "predictionType": PREDICTION_TYPE},
+            order={"createdAt": "desc"},
+            take=limit,
+        )
+        return [
+            {
+                "prediction": row.predictedValue,
+                "model": row.modelName,
+                "horizon": row.horizon,
+                "features": row.features,
+                "created_at": row.createdAt.isoformat(),
+            }
+            for row in rows
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "computed": self._flights.stats()["upstream_calls"],
+            "persisted": self.persisted,
+            "persist_failures": self.persist_failures,
+            "pending_writes": len(self._writes),
+        }
+
+
+prediction_cache = PredictionCache()
+
+
+def make_record(symbol: str, prediction: float, model_version: str, bar_ts: int, interval: str, runtime: str = None) -> dict:
+    return {
+        "symbol": symbol.upper(),
+        "prediction": float(prediction),
+        "model_version": model_version,
+        "bar_ts": int(bar_ts),
+        "as_of": datetime.fromtimestamp(int(bar_ts), tz=timezone.utc).isoformat(),
+        "interval": interval,
+        "runtime": runtime,
+        "computed_at": time.time(),
+    }
@@ -0,0 +1,138 @@
+"""In-process registry of loaded per-symbol models and scalers.
+
+Loading a ``.keras`` model and its two scalers from disk costs hundreds of
+milliseconds, so bundles are kept in an LRU cache bounded by count
+(``MODEL_CACHE_SIZE``) and approximate weight memory
+(``MODEL_CACHE_MAX_MB``). Each lookup stats the artifact files; when
+training publishes new ``_latest`` artifacts (from this or another
+process) their mtime/size signature changes and the bundle is reloaded.
+When ``paths`` carries a ``lite`` export the NumPy runtime is loaded
+instead of Keras.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from src.ml.lite import LiteModel
+
+
+class ModelBundle:
+    def __init__(self, symbol, model, feat_scaler, tgt_scaler, signature, load_seconds, runtime="keras"):
+        self.symbol = symbol
+        self.model = model
+        self.runtime = runtime
+        self.feat_scaler = feat_scaler
+        self.tgt_scaler = tgt_scaler
+        self.signature = signature
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.size_bytes = sum(w.nbytes for w in model.get_weights())
+
+    def predict(self, window):
+        if self.runtime == "lite":
+            return self.model.predict(window)
+        return self.model(window, training=False).numpy()
+
+
+def _signature(paths: dict):
+    sig = []
+    for key in sorted(paths):
+        st = os.stat(paths[key])
+        sig.append((key, st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+
+class ModelRegistry:
+    def __init__(self, max_models: int = None, max_mb: float = None):
+        self.max_models = max_models or int(os.getenv("MODEL_CACHE_SIZE", 8))
+        self.max_bytes = (max_mb or float(os.getenv("MODEL_CACHE_MAX_MB", 512))) * 1024 * 1024
+        self._bundles = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+        self.load_seconds_total = 0.0
+
+    def get(self, symbol: str, paths: dict) -> ModelBundle:
+        """Return the cached bundle for ``symbol``, loading ``paths`` on a miss or change.
+
+        ``paths`` maps ``model``, ``feat_scaler`` and ``tgt_scaler`` to files.
+        """
+        signature = _signature(paths)
+        with self._lock:
+            bundle = self._bundles.get(symbol)
+            if bundle is not None and bundle.signature == signature:
+                self._bundles.move_to_end(symbol)
+                self.hits += 1
+                return bundle
+            load_lock = self._load_locks.setdefault(symbol, threading.Lock())
+
+        with load_lock:
+            # Another thread may have loaded it while we waited
+            with self._lock:
+                bundle = self._bundles.get(symbol)
+                if bundle is not None and bundle.signature == signature:
+                    self._bundles.move_to_end(symbol)
+                    self.hits += 1
+                    return bundle
+                if bundle is not None:
+                    self.reloads += 1
+                self.misses += 1
+            bundle = self._load(symbol, paths, signature)
+            with self._lock:
+                self._bundles[symbol] = bundle
+                self._bundles.move_to_end(symbol)
+                self.load_seconds_total += bundle.load_seconds
+                self._evict()
+            return bundle
+
+    def _load(self, symbol, paths, signature) -> ModelBundle:
+        import joblib
+
+        started = time.perf_counter()
+        if paths.get("lite"):
+            model, runtime = LiteModel.load(paths["lite"]), "lite"
+        else:
+            from tensorflow.keras.models import load_model
+            model, runtime = load_model(paths["model"], compile=False), "keras"
+        feat_scaler = joblib.load(paths["feat_scaler"])
+        tgt_scaler = joblib.load(paths["tgt_scaler"])
+        return ModelBundle(symbol, model, feat_scaler, tgt_scaler, signature, time.perf_counter() - started, runtime)
+
+    def _evict(self):
+        total = sum(b.size_bytes for b in self._bundles.values())
+        while len(self._bundles) > 1 and (len(self._bundles) > self.max_models or total > self.max_bytes):
+            _, bundle = self._bundles.popitem(last=False)
+            total -= bundle.size_bytes
+            self.evictions += 1
+
+    def invalidate(self, symbol: str = None):
+        with self._lock:
+            if symbol is None:
+                self._bundles.clear()
+            else:
+                self._bundles.pop(symbol, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            loads = self.misses
+            return {
+                "models": len(self._bundles),
+                "max_models": self.max_models,
+                "bytes": sum(b.size_bytes for b in self._bundles.values()),
+                "max_bytes": int(self.max_bytes),
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+                "avg_load_seconds": round(self.load_seconds_total / loads, 4) if loads else 0.0,
+                "loaded": {
+                    s: {"runtime": b.runtime, "load_seconds": round(b.load_seconds, 4), "size_bytes": b.size_bytes}
+                    for s, b in self._bundles.items()
+                },
+            }
+
+
+registry = ModelRegistry()
@@ -0,0 +1,126 @@
+"""CPU training configuration: threads, batching, input pipeline, timing.
+
+Every knob has an environment variable, and explicit constructor arguments
+win over it:
+
+- ``TRAINING_THREADS_PER_WORKER`` sets TensorFlow intra-op threads (the
+  pool passes its per-worker share). ``TRAINING_INTER_OP_THREADS`` sets
+  inter-op threads. Unset means the TensorFlow default of all cores.
+- ``TRAINING_BATCH_SIZE`` (32).
+- ``TRAINING_PREFETCH`` (1) feeds ``fit`` from the prefetching ``tf.data``
+  window pipeline. With 0 it gets the arrays directly, and Keras copies every
+  window up front.
+- ``TRAINING_EPOCH_TIMING`` (1) adds a callback that records seconds and
+  samples per second for each epoch.
+- ``TRAINING_SEED`` seeds Python, NumPy and TensorFlow.
+  ``TRAINING_DETERMINISTIC=1`` also turns on deterministic TensorFlow ops,
+  for runs that can be reproduced exactly.
+
+Thread counts only take effect before TensorFlow starts its runtime, so
+``apply`` belongs at process start (the training workers and the benchmark
+call it there).
+"""
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def _flag(name: str, default: str) -> bool:
+    return os.getenv(name, default) not in ("0", "false", "False", "")
+
+
+class TrainingConfig:
+    def __init__(self, intra_op_threads: int = None, inter_op_threads: int = None, batch_size: int = None,
+                 prefetch: bool = None, epoch_timing: bool = None, seed: int = None, deterministic: bool = None):
+        self.intra_op_threads = intra_op_threads or int(os.getenv("TRAINING_THREADS_PER_WORKER", 0)) or None
+        self.inter_op_threads = (
+            inter_op_threads
+            or int(os.getenv("TRAINING_INTER_OP_THREADS", 0))
+            or (max(1, min(2, self.intra_op_threads)) if self.intra_op_threads else None)
+        )
+        self.batch_size = batch_size or int(os.getenv("TRAINING_BATCH_SIZE", 32))
+        self.prefetch = prefetch if prefetch is not None else _flag("TRAINING_PREFETCH", "1")
+        self.epoch_timing = epoch_timing if epoch_timing is not None else _flag("TRAINING_EPOCH_TIMING", "1")
+        seed = seed if seed is not None else os.getenv("TRAINING_SEED")
+        self.seed = int(seed) if seed not in (None, "") else None
+        self.deterministic = deterministic if deterministic is not None else _flag("TRAINING_DETERMINISTIC", "0")
+
+    def apply(self):
+        """Set thread counts and seeds for this process; call before TensorFlow runs any op."""
+        if self.intra_op_threads:
+            # Must be in place before TensorFlow or BLAS is first imported in this process
+            for var in THREAD_ENV_VARS:
+                os.environ[var] = str(self.intra_op_threads)
+            os.environ["TF_NUM_INTRAOP_THREADS"] = str(self.intra_op_threads)
+        if self.inter_op_threads:
+            os.environ["TF_NUM_INTEROP_THREADS"] = str(self.inter_op_threads)
+        os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+        import tensorflow as tf
+
+        try:
+            if self.intra_op_threads:
+                tf.config.threading.set_intra_op_parallelism_threads(self.intra_op_threads)
+            if self.inter_op_threads:
+                tf.config.threading.set_inter_op_parallelism_threads(self.inter_op_threads)
+        except RuntimeError as e:
+            logger.warning(f"TensorFlow thread settings not applied (runtime already started): {e}")
+        if self.seed is not None:
+            tf.keras.utils.set_random_seed(self.seed)
+        if self.deterministic:
+            tf.config.experimental.enable_op_determinism()
+
+    def to_dict(self) -> dict:
+        return {
+            "intra_op_threads": self.intra_op_threads,
+            "inter_op_threads": self.inter_op_threads,
+            "batch_size": self.batch_size,
+            "prefetch": self.prefetch,
+            "epoch_timing": self.epoch_timing,
+            "seed": self.seed,
+            "deterministic": self.deterministic,
+        }
+
+
+def epoch_timer(train_samples: int):
+    """Keras callback that times each epoch.
+
+    It adds ``epoch_seconds`` and ``samples_per_second`` to the epoch logs, so
+    callbacks after it (e.g. job progress) see them as well.
+    """
+    from tensorflow.keras.callbacks import Callback
+
+    class EpochTimer(Callback):
+        def __init__(self):
+            super().__init__()
+            self.seconds = []
+            self._started = None
+
+        def on_epoch_begin(self, epoch, logs=None):
+            self._started = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            elapsed = time.perf_counter() - self._started
+            self.seconds.append(elapsed)
+            if logs is not None:
+                logs["epoch_seconds"] = elapsed
+                logs["samples_per_second"] = train_samples / elapsed if elapsed > 0 else None
+            logger.info(f"Epoch {epoch + 1}: {elapsed:.2f}s, {train_samples / max(elapsed, 1e-9):.0f} samples/s")
+
+        def summary(self) -> dict:
+            if not self.seconds:
+                return {}
+            # The first epoch includes graph tracing; steady state is the rest
+            steady = sorted(self.seconds[1:] or self.seconds)
+            median = steady[len(steady) // 2]
+            return {
+                "first_epoch_seconds": round(self.seconds[0], 4),
+                "epoch_seconds_median": round(median, 4),
+                "samples_per_second": round(train_samples / median, 1) if median > 0 else None,
+                "fit_seconds": round(sum(self.seconds), 3),
+            }
+
+    return EpochTimer()
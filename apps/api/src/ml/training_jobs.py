@@ -0,0 +1,281 @@
+"""Background training jobs run in a separate worker process pool.
+
+``/train/{symbol}`` submits a job and returns its id straight away; the
+bars are fetched in the API process (through the bar cache and rate
+limiter) and ``model.fit`` runs in a spawned worker so the event loop
+never blocks. Workers report epoch progress over a queue that a drain
+thread folds into the job records served by ``/jobs``.
+
+``mode="incremental"`` warm-starts from the published model on the bars
+it has not seen plus a replay sample of older windows, and falls back to a
+full training when that is not possible or validation loss gets worse.
+
+A symbol has at most one active job: submitting while one is queued or
+running returns the existing job. ``TRAINING_WORKERS`` sets the pool size
+and ``TRAINING_THREADS_PER_WORKER`` the TensorFlow/BLAS thread budget of
+each worker (default: CPU count split across workers); the other knobs are
+in ``src/ml/training_config.py``.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from src.ml.training_config import TrainingConfig
+from src.ml.warmup import ml_warmup
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATES = ("queued", "fetching", "running")
+
+# Set in each worker process by _init_worker
+_progress_queue = None
+_config = None
+
+
+def _init_worker(progress_queue, threads: int):
+    global _progress_queue, _config
+    _progress_queue = progress_queue
+    _config = TrainingConfig(intra_op_threads=threads)
+    _config.apply()
+
+
+def _train_worker(job_id: str, symbol: str, df, epochs: int, mode: str = "full") -> dict:
+    from tensorflow.keras.callbacks import Callback
+    from src.ml.model_predict import data_end, preprocess, train_incremental, train_model
+
+    class _Progress(Callback):
+        def on_epoch_end(self, epoch, logs=None):
+            logs = logs or {}
+            _progress_queue.put((job_id, "epoch", {
+                "epoch": epoch + 1,
+                "loss": float(logs.get("loss", float("nan"))),
+                "val_loss": float(logs.get("val_loss", float("nan"))),
+                "epoch_seconds": logs.get("epoch_seconds"),
+                "samples_per_second": logs.get("samples_per_second"),
+            }))
+
+    _progress_queue.put((job_id, "running", {"pid": os.getpid()}))
+    if mode == "incremental":
+        model_path, version, info = train_incremental(
+            df, symbol, extra_callbacks=[_Progress()], epochs=epochs,
+            on_fallback=lambda reason: _progress_queue.put((job_id, "fallback", {"reason": reason})),
+            config=_config,
+        )
+        return {"model_path": model_path, "model_version": version, **info}
+    end = data_end(df)
+    X_train, X_test, y_train, y_test, scalers = preprocess(df)
+    model_path, version = train_model(
+        X_train, y_train, X_test, y_test, symbol, scalers,
+        extra_callbacks=[_Progress()], epochs=epochs, meta={"data_end": end}, config=_config,
+    )
+    return {
+        "mode": "full",
+        "model_path": model_path,
+        "model_version": version,
+        "train_samples": int(len(X_train)),
+        "val_samples": int(len(X_test)),
+    }
+
+
+class TrainingJob:
+    def __init__(self, symbol: str, epochs: int, mode: str = "full"):
+        self.id = uuid.uuid4().hex
+        self.symbol = symbol
+        self.mode = mode
+        self.fallback_reason = None
+        self.status = "queued"
+        self.epochs = epochs
+        self.epoch = 0
+        self.loss = None
+        self.val_loss = None
+        self.best_val_loss = None
+        self.epoch_seconds = None
+        self.samples_per_second = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE_STATES
+
+    def to_dict(self) -> dict:
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.id,
+            "symbol": self.symbol,
+            "status": self.status,
+            "mode": self.mode,
+            "fallback_reason": self.fallback_reason,
+            "progress": {
+                "epoch": self.epoch,
+                "max_epochs": self.epochs,
+                "loss": self.loss,
+                "val_loss": self.val_loss,
+                "best_val_loss": self.best_val_loss,
+                "epoch_seconds": self.epoch_seconds,
+                "samples_per_second": self.samples_per_second,
+            },
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": round(end - (self.started_at or self.created_at), 3),
+        }
+
+
+class TrainingJobs:
+    def __init__(self, workers: int = None, threads: int = None, history: int = None):
+        self.workers = workers or int(os.getenv("TRAINING_WORKERS", 1))
+        cpus = os.cpu_count() or 1
+        self.threads = threads or int(os.getenv("TRAINING_THREADS_PER_WORKER", max(1, cpus // self.workers)))
+        self.history = history or int(os.getenv("TRAINING_JOB_HISTORY", 100))
+        self.epochs = int(os.getenv("TRAINING_EPOCHS", 100))
+        self._ctx = multiprocessing.get_context("spawn")  # TensorFlow is not fork-safe
+        self._jobs = OrderedDict()
+        self._active = {}  # symbol -> job id
+        self._pool = None
+        self._queue = None
+        self._drain = None
+        self._tasks = set()
+        self.submitted = 0
+        self.deduped = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def _ensure_pool(self):
+        if self._pool is None:
+            self._queue = self._ctx.Queue()
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=self._ctx,
+                initializer=_init_worker,
+                initargs=(self._queue, self.threads),
+            )
+            self._drain = threading.Thread(target=self._drain_progress, args=(self._queue,), daemon=True)
+            self._drain.start()
+        return self._pool
+
+    def _drain_progress(self, queue):
+        while True:
+            item = queue.get()
+            if item is None:
+                return
+            job_id, kind, data = item
+            job = self._jobs.get(job_id)
+            if job is None or not job.active:
+                continue
+            if kind == "running":
+                job.status = "running"
+                job.started_at = time.time()
+            elif kind == "epoch":
+                job.epoch = data["epoch"]
+                job.loss = data["loss"]
+                job.val_loss = data["val_loss"]
+                job.epoch_seconds = data.get("epoch_seconds")
+                job.samples_per_second = data.get("samples_per_second")
+                if job.best_val_loss is None or data["val_loss"] < job.best_val_loss:
+                    job.best_val_loss = data["val_loss"]
+            elif kind == "fallback":
+                # Fine-tuning gave up; progress restarts for the full training
+                job.fallback_reason = data["reason"]
+                job.epoch = 0
+                job.best_val_loss = None
+
+    def submit(self, symbol: str, mode: str = "full") -> TrainingJob:
+        """Queue training for ``symbol``, or return the job already active for it.
+
+        ``mode="incremental"`` fine-tunes the published model and falls back
+        to a full training when that is not possible or does not help.
+        """
+        active_id = self._active.get(symbol.upper())
+        if active_id is not None:
+            self.deduped += 1
+            return self._jobs[active_id]
+        job = TrainingJob(symbol, self.epochs, mode)
+        self._jobs[job.id] = job
+        self._active[symbol.upper()] = job.id
+        self.submitted += 1
+        self._trim()
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: TrainingJob):
+        try:
+            job.status = "fetching"
+            model_predict = await ml_warmup.model_predict()
+            df = await model_predict.get_data(job.symbol)
+            job.status = "queued"
+            loop = asyncio.get_running_loop()
+            job.result = await loop.run_in_executor(
+                self._ensure_pool(), _train_worker, job.id, job.symbol, df, job.epochs, job.mode
+            )
+            job.status = "succeeded"
+            self.succeeded += 1
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._reset_pool()
+            job.status = "failed"
+            job.error = getattr(e, "detail", None) or str(e) or type(e).__name__
+            self.failed += 1
+            logger.error(f"Training job {job.id} for {job.symbol} failed: {job.error}")
+        finally:
+            job.finished_at = time.time()
+            if self._active.get(job.symbol.upper()) == job.id:
+                del self._active[job.symbol.upper()]
+
+    def _trim(self):
+        finished = [jid for jid, j in self._jobs.items() if not j.active]
+        for jid in finished[: max(0, len(self._jobs) - self.history)]:
+            del self._jobs[jid]
+
+    def _reset_pool(self):
+        pool, queue = self._pool, self._queue
+        self._pool = self._queue = self._drain = None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        if queue is not None:
+            queue.put(None)
+
+    def get(self, job_id: str):
+        return self._jobs.get(job_id)
+
+    def list(self, symbol: str = None):
+        jobs = reversed(self._jobs.values())
+        if symbol:
+            jobs = (j for j in jobs if j.symbol.upper() == symbol.upper())
+        return [j.to_dict() for j in jobs]
+
+    async def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        if self._pool is not None:
+            pool, queue = self._pool, self._queue
+            self._pool = self._queue = self._drain = None
+            await asyncio.to_thread(pool.shutdown, True, cancel_futures=True)
+            queue.put(None)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "threads_per_worker": self.threads,
+            "active": len(self._active),
+            "submitted": self.submitted,
+            "deduped": self.deduped,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+        }
+
+
+training_jobs = TrainingJobs()
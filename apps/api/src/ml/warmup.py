@@ -0,0 +1,90 @@
+"""Background warm-up of the ML stack.
+
+The API answers market, portfolio, user and WebSocket traffic as soon as
+it starts; pandas, scikit-learn, ``ta`` and the prediction module are
+imported in a worker thread by a startup task, followed by TensorFlow
+(only needed for Keras models without a lite export; skip it with
+``ML_WARM_TENSORFLOW=0``). Prediction routes await the subsystem they
+need, so a request arriving mid warm-up waits for that load instead of
+importing on the event loop. ``/ready`` reports each subsystem's state.
+"""
+import asyncio
+import importlib
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _import_ml_modules():
+    for name in ("pandas", "sklearn.preprocessing", "ta", "joblib", "src.ml.model_predict"):
+        importlib.import_module(name)
+    return importlib.import_module("src.ml.model_predict")
+
+
+def _import_tensorflow():
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    importlib.import_module("tensorflow.keras.models")
+
+
+SUBSYSTEMS = {
+    "ml_modules": _import_ml_modules,
+    "tensorflow": _import_tensorflow,
+}
+
+
+class MLWarmup:
+    def __init__(self):
+        self._tasks = {}
+        self._state = {name: {"state": "cold"} for name in SUBSYSTEMS}
+        self._runner = None
+
+    def start(self):
+        """Schedule the background warm-up; call from app startup."""
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._warm_all())
+
+    async def _warm_all(self):
+        names = ["ml_modules"]
+        if os.getenv("ML_WARM_TENSORFLOW", "1") != "0":
+            names.append("tensorflow")
+        for name in names:
+            try:
+                await self.ensure(name)
+            except Exception:
+                pass  # recorded in the subsystem state
+
+    async def _load(self, name):
+        state = self._state[name]
+        state.update(state="loading", started_at=time.time())
+        started = time.perf_counter()
+        try:
+            result = await asyncio.to_thread(SUBSYSTEMS[name])
+        except Exception as e:
+            state.update(state="failed", error=str(e), seconds=round(time.perf_counter() - started, 3))
+            logger.error(f"ML warm-up of {name} failed: {e}")
+            raise
+        state.update(state="ready", seconds=round(time.perf_counter() - started, 3))
+        return result
+
+    async def ensure(self, name: str):
+        """Load ``name`` once (shared by concurrent callers) and return its result."""
+        task = self._tasks.get(name)
+        if task is None or (task.done() and (task.cancelled() or task.exception() is not None)):
+            task = asyncio.ensure_future(self._load(name))
+            self._tasks[name] = task
+        return await asyncio.shield(task)
+
+    async def model_predict(self):
+        """The ``src.ml.model_predict`` module, imported off the event loop."""
+        return await self.ensure("ml_modules")
+
+    def is_ready(self, name: str) -> bool:
+        return self._state[name]["state"] == "ready"
+
+    def status(self) -> dict:
+        return {name: dict(state) for name, state in self._state.items()}
+
+
+ml_warmup = MLWarmup()
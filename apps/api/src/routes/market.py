@@ -1,8 +1,18 @@
-from fastapi import APIRouter, Query, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Query, HTTPException, Request
+from fastapi.responses import StreamingResponse
 import os
-from datetime import datetime, timedelta, timezone
-import httpx
+from src.services.http_client import clients
+from src.services.market_data import twelve_data_get
+from src.services.singleflight import upstream_flights
+from src.services.quote_batcher import quote_batcher
+from src.services.rate_limiter import rate_limiter
+from src.services.price_book import get_live_price, price_book
+from src.services.bar_cache import bar_cache, get_history, iter_history_many
+from src.services.bar_store import bar_store
+from src.services.bar_formats import json_bytes, negotiate_format, render_bars
+from src.services.downsample import METHODS as DOWNSAMPLE_METHODS, downsample
+from src.services.indicators import indicator_engine
+from src.services.bars import from_epoch
 
 router = APIRouter(prefix="/api/v1/market", tags=["market"])
 
@@ -13,18 +23,10 @@ async def get_current_price(symbol: str):
     if not api_key:
         raise HTTPException(status_code=500, detail="TWELVE_DATA_API_KEY not configured")
 
-    url = "https://api.twelvedata.com/price"
-    params = {"symbol": symbol.upper(), "apikey": api_key}
-    async with httpx.AsyncClient(timeout=10) as client:
-        resp = await client.get(url, params=params)
-        if resp.status_code != 200:
-            raise HTTPException(status_code=resp.status_code, detail=resp.text)
-        data = resp.json()
-        if "price" not in data:
-            # Twelve Data may return an error object with code/message
-            message = data.get("message") or data
-            raise HTTPException(status_code=404, detail=str(message))
-        return {"symbol": symbol.upper(), "price": float(data["price"])}
+    # Streamed price when fresh; otherwise merged with other single-symbol
+    # lookups into one multi-symbol /price call
+    price, source = await get_live_price(symbol)
+    return {"symbol": symbol.upper(), "price": price, "source": source}
 
 
 @router.get("/quote")
@@ -35,13 +37,8 @@ async def get_prices_multiple(symbols: str = Query(..., description="Comma Separ
 
     symbol_list = [s.strip().upper() for s in symbols.split(",") if s.strip()]
     # Twelve Data supports multiple symbols in one call for /price
-    url = "https://api.twelvedata.com/price"
     params = {"symbol": ",".join(symbol_list), "apikey": api_key}
-    async with httpx.AsyncClient(timeout=15) as client:
-        resp = await client.get(url, params=params)
-        if resp.status_code != 200:
-            raise HTTPException(status_code=resp.status_code, detail=resp.text)
-        data = resp.json()
+    data = await twelve_data_get("/price", params)
 
     results = []
     # When multiple symbols are requested, response is a dict keyed by symbol
@@ -59,68 +56,85 @@ async def get_prices_multiple(symbols: str = Query(..., description="Comma Separ
 
 @router.get("/history/{symbol}")
 async def get_historical_data(
+    request: Request,
     symbol: str,
     period: str = Query("1mo", description="1d, 5d, 1mo, 6mo, 1y, 5y"),
-    interval: str = Query("1d", description="1min, 5min, 15min, 1h, 1day, 1week, 1month")
+    interval: str = Query("1d", description="1min, 5min, 15min, 1h, 1day, 1week, 1month"),
+    fmt: str = Query(None, alias="format", description="records, columnar, msgpack, arrow (or use the Accept header)"),
+    max_points: int = Query(None, ge=3, description="Reduce the series to at most this many points"),
+    method: str = Query("ohlc", description="Downsampling method: ohlc (bucket aggregation) or lttb"),
 ):
-    api_key = os.getenv("TWELVE_DATA_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="TWELVE_DATA_API_KEY not configured")
+    fmt = negotiate_format(fmt, request.headers.get("accept"))
+    # Served from the bar cache; only missing head/tail ranges go upstream
+    bars = await get_history(symbol, period, interval)
+    if max_points:
+        bars = downsample(bars, max_points, method)
+    return render_bars(bars, fmt)
 
-    # Map to Twelve Data interval values
-    interval_map = {
-        "1m": "1min",
-        "5m": "5min",
-        "15m": "15min",
-        "1h": "1h",
-        "1d": "1day",
-        "1wk": "1week",
-        "1mo": "1month",
-    }
-    td_interval = interval_map.get(interval, "1day")
-
-    # Compute date range
-    period_map = {
-        "1d": timedelta(days=1),
-        "5d": timedelta(days=5),
-        "1mo": timedelta(days=30),
-        "6mo": timedelta(days=182),
-        "1y": timedelta(days=365),
-        "5y": timedelta(days=365 * 5),
-    }
-    delta = period_map.get(period, timedelta(days=30))
-    end_dt = datetime.now(timezone.utc)
-    start_dt = end_dt - delta
 
-    url = "https://api.twelvedata.com/time_series"
-    params = {
+@router.get("/history")
+async def get_historical_data_multiple(
+    symbols: str = Query(..., description="Comma Separated Symbols"),
+    period: str = Query("1mo", description="1d, 5d, 1mo, 6mo, 1y, 5y"),
+    interval: str = Query("1d", description="1min, 5min, 15min, 1h, 1day, 1week, 1month"),
+    fmt: str = Query("records", alias="format", description="records or columnar"),
+    concurrency: int = Query(None, ge=1, le=32, description="Symbols fetched in parallel"),
+    max_points: int = Query(None, ge=3, description="Reduce each series to at most this many points"),
+    method: str = Query("ohlc", description="Downsampling method: ohlc (bucket aggregation) or lttb"),
+):
+    """Stream one NDJSON line per symbol as soon as its history is ready."""
+    symbol_list = list(dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip()))
+    if fmt not in ("records", "columnar"):
+        raise HTTPException(status_code=400, detail="format must be records or columnar")
+    if method not in DOWNSAMPLE_METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of: {', '.join(DOWNSAMPLE_METHODS)}")
+
+    async def lines():
+        async for sym, result in iter_history_many(symbol_list, period, interval, concurrency):
+            if isinstance(result, Exception):
+                status = getattr(result, "status_code", 500)
+                detail = getattr(result, "detail", None) or str(result)
+                line = {"symbol": sym, "status": status, "error": detail}
+            else:
+                bars = downsample(result, max_points, method) if max_points else result
+                data = bars.to_columnar() if fmt == "columnar" else bars.to_records()
+                line = {"symbol": sym, "status": 200, "count": len(bars), "data": data}
+            yield json_bytes(line) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/indicators/{symbol}")
+async def get_indicators(
+    symbol: str,
+    period: str = Query("1y", description="History used to seed the indicators on first use"),
+    interval: str = Query("1d", description="1min, 5min, 15min, 1h, 1day, 1week, 1month"),
+):
+    """Latest OHLCV, RSI_14, SMA_20 and Bollinger bands from the streaming engine."""
+    # A cache hit here also lets the engine pick up a refreshed tail
+    bars = await get_history(symbol, period, interval)
+    state = indicator_engine.track(symbol, bars.td_interval, bars)
+    latest = state.latest()
+    if latest is None:
+        raise HTTPException(status_code=404, detail=f"No bars for '{symbol}'")
+    return {
         "symbol": symbol.upper(),
-        "interval": td_interval,
-        "start_date": start_dt.strftime("%Y-%m-%d %H:%M:%S"),
-        "end_date": end_dt.strftime("%Y-%m-%d %H:%M:%S"),
-        "timezone": "UTC",
-        "apikey": api_key,
+        "interval": bars.td_interval,
+        "as_of": from_epoch(state.head[0]).isoformat(),
+        "indicators": latest,
     }
-    async with httpx.AsyncClient(timeout=20) as client:
-        resp = await client.get(url, params=params)
-        if resp.status_code != 200:
-            raise HTTPException(status_code=resp.status_code, detail=resp.text)
-        data = resp.json()
-        if data.get("status") not in ("ok", None) or "values" not in data:
-            raise HTTPException(status_code=404, detail=data.get("message", "no data"))
-
-    values = data.get("values", [])
-    records = []
-    for v in reversed(values):  # ensure chronological order
-        records.append({
-            "Date": v.get("datetime"),
-            "Open": float(v.get("open")) if v.get("open") is not None else None,
-            "High": float(v.get("high")) if v.get("high") is not None else None,
-            "Low": float(v.get("low")) if v.get("low") is not None else None,
-            "Close": float(v.get("close")) if v.get("close") is not None else None,
-            "Volume": int(float(v.get("volume"))) if v.get("volume") is not None else None,
-        })
-
-    return JSONResponse(content=records)
 
 
+@router.get("/stats")
+async def get_upstream_stats():
+    """Upstream connection pool and cache usage."""
+    return {
+        "http_pool": clients.stats(),
+        "bar_cache": bar_cache.stats(),
+        "bar_store": bar_store.stats(),
+        "singleflight": upstream_flights.stats(),
+        "quote_batcher": quote_batcher.stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "price_book": price_book.stats(),
+        "indicators": indicator_engine.stats(),
+    }
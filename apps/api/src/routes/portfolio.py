@@ -3,7 +3,7 @@ from prisma import Prisma
 from pydantic import BaseModel
 import os
 from jose import jwt
-import httpx
+from src.services.price_book import get_live_price
 
 prisma = Prisma()
 
@@ -67,17 +67,14 @@ async def get_trades(request: Request):
 async def make_trade(trade: TradeRequest, request: Request):
     db = await get_prisma()
     try:
-        # Fetch live price directly
+        # Live price from the stream when fresh, else a batched REST lookup
         symbol = trade.stockSymbol.upper()
-        async with httpx.AsyncClient(timeout=10) as client:
-            api_internal_base = os.getenv("API_INTERNAL_BASE_URL", "http://localhost:8080")
-            resp = await client.get(f"{api_internal_base}/api/v1/market/quote/{symbol}")
-            if resp.status_code != 200:
-                raise HTTPException(status_code=resp.status_code, detail=f"Failed to fetch price for {symbol}: {resp.text}")
-            live = resp.json()
-            current_price = float(live.get("price"))
-            if not current_price or current_price <= 0:
-                raise HTTPException(status_code=400, detail=f"Invalid live price for {symbol}")
+        try:
+            current_price, _ = await get_live_price(symbol)
+        except HTTPException as e:
+            raise HTTPException(status_code=e.status_code, detail=f"Failed to fetch price for {symbol}: {e.detail}")
+        if not current_price or current_price <= 0:
+            raise HTTPException(status_code=400, detail=f"Invalid live price for {symbol}")
 
         # Ensure Stock exists to satisfy FK constraints (auto-create if missing)
         try:
@@ -1,55 +1,160 @@
-from fastapi import APIRouter, HTTPException
-from src.ml.model_train import train
-from src.ml.model_predict import predict_stock
-from src.ml.model_predict import get_data
 import os
+from datetime import timedelta
+from fastapi import APIRouter, HTTPException, Query
+from src.ml.registry import registry
+from src.ml.artifacts import artifact_store
+from src.ml.prediction_cache import prediction_cache
+from src.ml.training_jobs import training_jobs
+from src.ml.warmup import ml_warmup
+from src.ml.precompute import prediction_precompute
 
 router = APIRouter(prefix="/api/v1/predictions", tags=["predictions"])
 
-@router.get("/train/{symbol}")
-async def start_train(symbol: str):
-    await train(symbol)
-    return {"symbol": symbol, "status": "training_completed"}
+@router.get("/train/{symbol}", status_code=202)
+async def start_train(symbol: str, mode: str = Query("full", pattern="^(full|incremental)$")):
+    # Training runs in the worker pool; poll /jobs/{job_id} for progress
+    job = training_jobs.submit(symbol, mode)
+    return job.to_dict()
+
+
+@router.get("/jobs")
+async def list_jobs(symbol: str = None):
+    return {"jobs": training_jobs.list(symbol), "stats": training_jobs.stats()}
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Training job '{job_id}' not found")
+    return job.to_dict()
+
+
+@router.get("/predict")
+async def get_predictions(symbols: str = Query(..., description="Comma Separated Symbols")):
+    """Predictions for several symbols in one call; each symbol carries its own status."""
+    symbol_list = list(dict.fromkeys(s.strip() for s in symbols.split(",") if s.strip()))
+    max_symbols = int(os.getenv("PREDICT_MAX_SYMBOLS", 100))
+    if not symbol_list:
+        raise HTTPException(status_code=400, detail="No symbols given")
+    if len(symbol_list) > max_symbols:
+        raise HTTPException(status_code=400, detail=f"At most {max_symbols} symbols per request")
+    model_predict = await ml_warmup.model_predict()
+    results = await model_predict.predict_many(symbol_list)
+    out = []
+    for symbol in symbol_list:
+        result = results[symbol]
+        if isinstance(result, FileNotFoundError):
+            out.append({"symbol": symbol, "status": 404,
+                        "error": f"Model needs to be trained first for '{symbol}' stock"})
+        elif isinstance(result, Exception):
+            status = getattr(result, "status_code", 422 if isinstance(result, ValueError) else 500)
+            out.append({"symbol": symbol, "status": status, "error": getattr(result, "detail", None) or str(result)})
+        else:
+            record, cached = result
+            out.append({
+                "symbol": symbol,
+                "status": 200,
+                "prediction": record["prediction"],
+                "model_version": record["model_version"],
+                "as_of": record["as_of"],
+                "cached": cached,
+            })
+    return {"results": out}
 
 
 @router.get("/predict/{symbol}")
 async def get_prediction(symbol: str):
-    models_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "models"))
-    model_path = os.path.join(models_dir, f"{symbol}.keras")
-    if os.path.exists(model_path):
-        df = await get_data(symbol)
-        if df is None:
-            raise HTTPException(status_code=502, detail="Failed to fetch market data for prediction")
-        prediction_result = await predict_stock(symbol)
-        
-        # Handle error cases
-        if prediction_result == 500:
-            raise HTTPException(status_code=500, detail="Error making prediction")
-        
-        # Convert numpy float to Python float for JSON serialization
-        if hasattr(prediction_result, 'item'):  # numpy scalar
-            prediction_result = prediction_result.item()
-        elif isinstance(prediction_result, (int, float)):
-            prediction_result = float(prediction_result)
-    else:
+    # Inference only against the latest published artifacts; retrain via /train
+    model_predict = await ml_warmup.model_predict()
+    try:
+        record, cached = await model_predict.predict_latest(symbol)
+    except FileNotFoundError:
         raise HTTPException(
-            status_code=404, 
+            status_code=404,
             detail=f"Model needs to be trained first for '{symbol}' stock"
         )
-    return {"symbol": symbol, "prediction": prediction_result}
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    # Unchanged until a new bar arrives or a new model version is published
+    return {
+        "symbol": symbol,
+        "prediction": record["prediction"],
+        "model_version": record["model_version"],
+        "as_of": record["as_of"],
+        "cached": cached,
+    }
+
+
+@router.get("/backtest/{symbol}")
+async def run_backtest(
+    symbol: str,
+    version: str = None,
+    start: str = Query(None, description="YYYY-MM-DD (default: one year before end)"),
+    end: str = Query(None, description="YYYY-MM-DD (default: today)"),
+    runtime: str = Query(None, pattern="^(lite|keras)$"),
+    series: bool = False,
+):
+    # Needs the ML modules; each run is one batched forward pass over every window in range
+    await ml_warmup.model_predict()
+    from src.ml.backtest import backtest, parse_date
+
+    try:
+        start_dt, end_dt = parse_date(start), parse_date(end)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Dates must be YYYY-MM-DD")
+    if end_dt is not None:
+        end_dt += timedelta(days=1) - timedelta(seconds=1)
+    try:
+        return await backtest(symbol, version, start_dt, end_dt, runtime, series)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@router.get("/history/{symbol}")
+async def get_prediction_history(symbol: str, limit: int = Query(50, ge=1, le=500)):
+    try:
+        rows = await prediction_cache.history(symbol, limit)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Prediction history unavailable: {e}")
+    return {"symbol": symbol, "predictions": rows}
+
+@router.get("/precompute")
+async def precompute_status():
+    return prediction_precompute.stats()
+
+
+@router.post("/precompute/run", status_code=202)
+async def start_precompute():
+    # Runs in the background; a run already in progress is reused
+    prediction_precompute.trigger()
+    return {"running": prediction_precompute.running}
+
 
 @router.get("/model/status/{symbol}")
 async def check_status(symbol: str):
-    models_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "models"))
-    model_path = os.path.join(models_dir, f"{symbol}.keras")
-    if os.path.exists(model_path):
+    model_predict = await ml_warmup.model_predict()
+    if model_predict.has_latest_artifacts(symbol):
         return {"status": f"Model exists for {symbol} stock. Proceed with prediction"}
-       
     else:
         raise HTTPException(
-            status_code=404, 
+            status_code=404,
             detail=f"Model needs to be trained first for '{symbol}' stock"
         )
-    
 
 
+@router.get("/model/cache")
+async def model_cache_stats():
+    return {**registry.stats(), "predictions": prediction_cache.stats()}
+
+
+@router.get("/model/versions/{symbol}")
+async def list_model_versions(symbol: str):
+    return {
+        "symbol": symbol,
+        "latest": artifact_store.latest_version(symbol),
+        "versions": artifact_store.versions(symbol),
+        "store": artifact_store.stats(),
+    }
@@ -0,0 +1,303 @@
+"""In-memory OHLCV bar cache with gap-only upstream fetches.
+
+Bars are cached per (symbol, interval). A request only goes upstream for
+the part of its window the cache does not hold yet: a head gap when an
+earlier start is asked for, or the tail past the latest time already
+fetched once the interval's TTL has passed or the request reaches further
+than that (the last bar may still be forming, so the tail is re-read from
+that bar onwards). Closed daily/weekly/monthly bars never expire;
+intraday entries are dropped entirely after a few hours. Memory is
+bounded by a total bar budget with LRU eviction.
+
+Misses are served from the on-disk bar store first, and every upstream
+fetch is appended to it, so history survives restarts. Listeners (the
+streaming indicator engine) see each upstream fetch as it lands.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+import httpx
+from fastapi import HTTPException
+from src.services.bar_store import bar_store
+from src.services.bars import Bars, epoch_seconds, from_epoch, to_naive_utc
+from src.services.rate_limiter import Priority
+from src.services.market_data import fetch_time_series, resolve_interval, resolve_range
+
+logger = logging.getLogger(__name__)
+
+# interval -> (tail TTL seconds, max entry age seconds or None for never)
+INTERVAL_TTLS = {
+    "1min": (30, 6 * 3600),
+    "5min": (60, 6 * 3600),
+    "15min": (120, 6 * 3600),
+    "1h": (300, 24 * 3600),
+    "1day": (900, None),
+    "1week": (3600, None),
+    "1month": (6 * 3600, None),
+}
+
+
+class _Entry:
+    def __init__(self, start: datetime, td_interval: str):
+        self.start = start          # earliest time fetched from upstream
+        self.end = start            # latest time fetched from upstream
+        self.bars = Bars.empty(td_interval)
+        self.created_at = time.monotonic()
+        self.refreshed_at = 0.0
+
+    def merge(self, bars: Bars):
+        """Splice a contiguous, chronological chunk of bars into the entry."""
+        self.bars = self.bars.merge(bars)
+
+    def last_bar(self):
+        return from_epoch(self.bars.ts[-1]) if len(self.bars) else None
+
+    def slice(self, start: datetime, end: datetime) -> Bars:
+        return self.bars.slice_ts(epoch_seconds(start), epoch_seconds(end))
+
+
+class BarCache:
+    def __init__(self, max_bars: int = None, store=bar_store):
+        self.max_bars = max_bars or int(os.getenv("BAR_CACHE_MAX_BARS", 500_000))
+        self.store = store
+        self._entries = OrderedDict()
+        self._locks = {}
+        self._listeners = []
+        self._total_bars = 0
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        self.store_loads = 0
+        self.upstream_fetches = 0
+        self.bars_fetched = 0
+        self.evictions = 0
+
+    async def _fetch(self, symbol, td_interval, start, end, priority):
+        self.upstream_fetches += 1
+        bars = await fetch_time_series(symbol, td_interval, start, end, priority)
+        self.bars_fetched += len(bars)
+        for listener in self._listeners:
+            try:
+                listener(symbol, td_interval, bars)
+            except Exception as e:
+                logger.warning(f"Bar cache listener failed for {symbol} {td_interval}: {e}")
+        if self.store is not None:
+            try:
+                await asyncio.to_thread(self.store.append, symbol, td_interval, bars, start, end)
+            except OSError as e:
+                logger.warning(f"Bar store append failed for {symbol} {td_interval}: {e}")
+        return bars
+
+    def add_listener(self, listener):
+        """Call ``listener(symbol, td_interval, bars)`` with every upstream fetch."""
+        self._listeners.append(listener)
+
+    async def _read_store(self, symbol, td_interval, start, end):
+        """Return ``(bars, covered_start, covered_end)`` from disk, or ``None``."""
+        if self.store is None:
+            return None
+        try:
+            stored = await asyncio.to_thread(self.store.read, symbol, td_interval, start, end)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Bar store read failed for {symbol} {td_interval}: {e}")
+            return None
+        if stored is None:
+            return None
+        bars, (cov_start, cov_end) = stored
+        return bars, from_epoch(cov_start), from_epoch(cov_end)
+
+    async def _load_stored(self, symbol, td_interval, start, end, now):
+        """Build an entry from the on-disk store, or ``None`` if nothing is stored."""
+        stored = await self._read_store(symbol, td_interval, start, end)
+        if stored is None:
+            return None
+        bars, cov_start, cov_end = stored
+        entry = _Entry(max(start, cov_start), td_interval)
+        entry.merge(bars)
+        entry.end = cov_end
+        # Age the tail by how long ago the store last covered it
+        age = (datetime.now(timezone.utc).replace(tzinfo=None) - cov_end).total_seconds()
+        entry.refreshed_at = now - max(age, 0.0)
+        return entry
+
+    async def _fill_head(self, entry, symbol, td_interval, start, priority):
+        """Extend the entry back to ``start``: from disk where covered, upstream otherwise."""
+        upstream_end = entry.start
+        stored = await self._read_store(symbol, td_interval, start, entry.start)
+        if stored is not None:
+            bars, cov_start, cov_end = stored
+            # Only a stored window that reaches the entry extends it without a hole
+            if cov_start < entry.start <= cov_end:
+                entry.merge(bars)
+                upstream_end = max(start, cov_start)
+        # Disk covers [upstream_end, entry.start]; only upstream can fill the rest
+        entry.start = upstream_end
+        if start < upstream_end:
+            try:
+                entry.merge(await self._fetch(symbol, td_interval, start, upstream_end, priority))
+            except HTTPException as e:
+                # 404 is a real "no bars before this" answer; anything else leaves
+                # the gap open so the next request fetches it again
+                if e.status_code != 404:
+                    raise
+        entry.start = start
+
+    async def get_bars(
+        self,
+        symbol: str,
+        td_interval: str,
+        start_dt: datetime,
+        end_dt: datetime,
+        priority: Priority = Priority.HISTORY,
+    ):
+        """Return chronological ``Bars`` for ``[start_dt, end_dt]``, fetching only missing ranges."""
+        symbol = symbol.upper()
+        key = (symbol, td_interval)
+        start, end = to_naive_utc(start_dt), to_naive_utc(end_dt)
+        tail_ttl, max_age = INTERVAL_TTLS.get(td_interval, (300, None))
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry is not None and max_age is not None and now - entry.created_at > max_age:
+                self._drop(key)
+                entry = None
+
+            if entry is None:
+                entry = await self._load_stored(symbol, td_interval, start, end, now)
+                if entry is not None:
+                    self.store_loads += 1
+                    self._store(key, entry)
+
+            if entry is None:
+                self.misses += 1
+                entry = _Entry(start, td_interval)
+                entry.merge(await self._fetch(symbol, td_interval, start, end, priority))
+                entry.end = end
+                entry.refreshed_at = now
+                self._store(key, entry)
+                return entry.slice(start, end)
+
+            fetched = False
+            before = len(entry.bars)
+            if start < entry.start:
+                fetched = True
+                await self._fill_head(entry, symbol, td_interval, start, priority)
+            # A historical end the entry already reaches needs no tail refresh
+            gap = (end - entry.end).total_seconds()
+            if gap > 0 and (gap > tail_ttl or now - entry.refreshed_at > tail_ttl):
+                fetched = True
+                tail_from = entry.last_bar() or entry.start
+                if await self._refresh(entry, symbol, td_interval, tail_from, end, priority):
+                    entry.end = end
+                    entry.refreshed_at = now
+            if fetched:
+                self.partial_hits += 1
+            else:
+                self.hits += 1
+            if self._entries.get(key) is entry:
+                self._total_bars += len(entry.bars) - before
+                self._entries.move_to_end(key)
+                self._evict()
+            else:
+                # Other keys' fetches evicted us while we awaited upstream
+                self._store(key, entry)
+            return entry.slice(start, end)
+
+    async def _refresh(self, entry, symbol, td_interval, start, end, priority) -> bool:
+        """Merge the tail from upstream; ``False`` when upstream failed and the tail is still stale."""
+        try:
+            entry.merge(await self._fetch(symbol, td_interval, start, end, priority))
+        except HTTPException as e:
+            # No bars in the gap (e.g. market closed) is an answer
+            if e.status_code == 404:
+                return True
+            # Upstream hiccup: keep serving what we hold and retry on the next request
+            logger.warning(f"Bar cache refresh failed for {symbol} {td_interval}: {e.detail}")
+            return False
+        except httpx.HTTPError as e:
+            logger.warning(f"Bar cache refresh failed for {symbol} {td_interval}: {e!r}")
+            return False
+        return True
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._total_bars += len(entry.bars)
+        self._evict()
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bars -= len(entry.bars)
+        lock = self._locks.get(key)
+        if lock is not None and not lock.locked():
+            del self._locks[key]
+
+    def _evict(self):
+        # Always keep the most recently used entry, even if it alone exceeds the budget
+        while self._total_bars > self.max_bars and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def invalidate(self, symbol: str = None):
+        for key in list(self._entries):
+            if symbol is None or key[0] == symbol.upper():
+                self._drop(key)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bars": self._total_bars,
+            "max_bars": self.max_bars,
+            "hits": self.hits,
+            "partial_hits": self.partial_hits,
+            "misses": self.misses,
+            "store_loads": self.store_loads,
+            "upstream_fetches": self.upstream_fetches,
+            "bars_fetched": self.bars_fetched,
+            "evictions": self.evictions,
+        }
+
+
+bar_cache = BarCache()
+
+
+async def get_history(symbol: str, period: str = "1mo", interval: str = "1d", priority: Priority = Priority.HISTORY):
+    """History ``Bars`` for a period/interval pair, served through the bar cache."""
+    start_dt, end_dt = resolve_range(period)
+    return await bar_cache.get_bars(symbol, resolve_interval(interval), start_dt, end_dt, priority)
+
+
+async def iter_history_many(
+    symbols,
+    period: str = "1mo",
+    interval: str = "1d",
+    concurrency: int = None,
+    priority: Priority = Priority.HISTORY,
+):
+    """Yield ``(symbol, bars_or_exception)`` as each symbol's history completes.
+
+    At most ``concurrency`` symbols are fetched at once; a failure is
+    yielded in place of that symbol's bars instead of aborting the rest.
+    """
+    concurrency = concurrency or int(os.getenv("HISTORY_BATCH_CONCURRENCY", 8))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(symbol):
+        async with semaphore:
+            try:
+                return symbol, await get_history(symbol, period, interval, priority)
+            except Exception as e:
+                return symbol, e
+
+    tasks = [asyncio.create_task(one(symbol)) for symbol in symbols]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
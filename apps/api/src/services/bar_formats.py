@@ -0,0 +1,103 @@
+"""Response encodings for history bars.
+
+``/history`` negotiates one of these formats from its ``format`` query
+parameter or the ``Accept`` header:
+
+- ``records``  (``application/json``): list of per-bar dicts, the legacy shape
+- ``columnar`` (``application/vnd.sigmoidal.columnar+json``): one array per field
+- ``msgpack``  (``application/msgpack``): columnar, ``ts`` as epoch seconds
+- ``arrow``    (``application/vnd.apache.arrow.stream``): Arrow IPC stream
+
+JSON is serialised with orjson when it is installed. Binary formats need
+their optional library and answer 406 when it is missing.
+"""
+import io
+import json
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, Response
+from src.services.bars import FIELDS, Bars, nullable_list
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+MEDIA_TYPES = {
+    "records": "application/json",
+    "columnar": "application/vnd.sigmoidal.columnar+json",
+    "msgpack": "application/msgpack",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+ACCEPT_ALIASES = {
+    "application/x-msgpack": "msgpack",
+    "application/vnd.apache.arrow.file": "arrow",
+}
+
+
+def negotiate_format(fmt: str = None, accept: str = None) -> str:
+    """Pick a format from an explicit ``format`` value, else the Accept header."""
+    if fmt:
+        fmt = fmt.lower()
+        if fmt not in MEDIA_TYPES:
+            raise HTTPException(status_code=400, detail=f"Unknown format '{fmt}'. Use one of: {', '.join(MEDIA_TYPES)}")
+        return fmt
+    by_media = {media: name for name, media in MEDIA_TYPES.items()}
+    by_media.update(ACCEPT_ALIASES)
+    for part in (accept or "").split(","):
+        media = part.split(";")[0].strip().lower()
+        if media in by_media:
+            return by_media[media]
+    return "records"
+
+
+def json_bytes(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, separators=(",", ":")).encode()
+
+
+def json_response(content, media_type: str = "application/json") -> Response:
+    if orjson is not None:
+        return Response(content=orjson.dumps(content), media_type=media_type)
+    return JSONResponse(content=content, media_type=media_type)
+
+
+def _msgpack_payload(bars: Bars) -> dict:
+    payload = {"ts": bars.ts.tolist()}
+    for f in FIELDS:
+        payload[f] = nullable_list(bars.columns[f])
+    return payload
+
+
+def _arrow_stream(bars: Bars) -> bytes:
+    arrays = [pa.array(bars.ts, type=pa.timestamp("s", tz="UTC"))]
+    arrays += [pa.array(bars.columns[f], from_pandas=True) for f in FIELDS]  # NaN -> null
+    table = pa.Table.from_arrays(arrays, names=["Date", *FIELDS])
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def render_bars(bars: Bars, fmt: str) -> Response:
+    if fmt == "columnar":
+        return json_response(bars.to_columnar(), MEDIA_TYPES["columnar"])
+    if fmt == "msgpack":
+        if msgpack is None:
+            raise HTTPException(status_code=406, detail="msgpack is not installed on this server")
+        return Response(content=msgpack.packb(_msgpack_payload(bars)), media_type=MEDIA_TYPES["msgpack"])
+    if fmt == "arrow":
+        if pa is None:
+            raise HTTPException(status_code=406, detail="pyarrow is not installed on this server")
+        return Response(content=_arrow_stream(bars), media_type=MEDIA_TYPES["arrow"])
+    return json_response(bars.to_records())
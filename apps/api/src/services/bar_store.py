@@ -0,0 +1,323 @@
+"""On-disk, append-only columnar store for OHLCV bars.
+
+One file per (symbol, interval) under ``BAR_STORE_DIR`` (default
+``apps/api/data/bars``). A file is a magic header followed by blocks; each
+block holds a sorted run of bars laid out column by column::
+
+    b"BLK0" | pad | n (u64) | range_start (i64) | range_end (i64)
+    ts[n] (i64 epoch seconds, UTC) | open[n] | high[n] | low[n] | close[n] | volume[n] (f64, NaN = missing)
+
+``range_start``/``range_end`` record the window that was fetched, so the
+store knows which dates it has covered even where there are no bars
+(weekends, holidays). Separate fetch windows are kept apart, so a gap
+between them is never reported as covered. Reads memory-map the file and
+binary-search each block's ``ts`` column, so a date-range query only
+touches the slices it returns. Later blocks win when bars overlap (a re-read tail replaces a bar
+that was still forming). Files are compacted into one block per
+continuous coverage window once they accumulate too many blocks.
+
+Offline backfill::
+
+    python -m src.services.bar_store backfill bars.json --interval 1d
+"""
+import argparse
+import csv
+import fcntl
+import json
+import logging
+import os
+import re
+import struct
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+from src.services.bars import FIELDS, Bars, epoch_seconds, from_epoch
+from src.services.market_data import resolve_interval
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = os.getenv(
+    "BAR_STORE_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "bars")),
+)
+MAX_BLOCKS = int(os.getenv("BAR_STORE_MAX_BLOCKS", 64))
+
+FILE_MAGIC = b"SGBARS01"
+BLOCK_MAGIC = b"BLK0"
+BLOCK_HEADER = struct.Struct("<4s4xQqq")
+COLUMNS = FIELDS
+
+
+class BarStore:
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+        self.reads = 0
+        self.bars_read = 0
+        self.appends = 0
+        self.bars_written = 0
+        self.compactions = 0
+
+    def path(self, symbol: str, td_interval: str) -> str:
+        safe = re.sub(r"[^A-Za-z0-9.\-]", "_", symbol.upper())
+        return os.path.join(self.root, f"{safe}_{td_interval}.bars")
+
+    # ---- reading ----
+
+    def _blocks(self, buf):
+        """Yield (n, range_start, range_end, column offset) for each complete block."""
+        offset = len(FILE_MAGIC)
+        size = len(buf)
+        while offset + BLOCK_HEADER.size <= size:
+            magic, n, range_start, range_end = BLOCK_HEADER.unpack_from(buf, offset)
+            body = offset + BLOCK_HEADER.size
+            end = body + n * 8 * (1 + len(COLUMNS))
+            if magic != BLOCK_MAGIC or end > size:
+                break  # torn write at the tail; ignored and truncated on next append
+            yield n, range_start, range_end, body
+            offset = end
+
+    def _scan(self, f, size: int):
+        """Walk block headers only; returns (valid length, block count)."""
+        offset, blocks = len(FILE_MAGIC), 0
+        while offset + BLOCK_HEADER.size <= size:
+            f.seek(offset)
+            magic, n, _, _ = BLOCK_HEADER.unpack(f.read(BLOCK_HEADER.size))
+            end = offset + BLOCK_HEADER.size + n * 8 * (1 + len(COLUMNS))
+            if magic != BLOCK_MAGIC or end > size:
+                break
+            offset, blocks = end, blocks + 1
+        return offset, blocks
+
+    def _slice(self, mm, blocks, lo_ts: int, hi_ts: int, td_interval: str) -> Bars:
+        """Bars in ``[lo_ts, hi_ts]`` across ``blocks``, newest write winning duplicates."""
+        ts_parts, col_parts = [], {c: [] for c in COLUMNS}
+        for n, _, _, body in blocks:
+            ts = np.frombuffer(mm, dtype="<i8", count=n, offset=body)
+            lo = np.searchsorted(ts, lo_ts, side="left")
+            hi = np.searchsorted(ts, hi_ts, side="right")
+            if lo >= hi:
+                continue
+            ts_parts.append(np.array(ts[lo:hi]))
+            for i, col in enumerate(COLUMNS):
+                values = np.frombuffer(mm, dtype="<f8", count=n, offset=body + (i + 1) * n * 8)
+                col_parts[col].append(np.array(values[lo:hi]))
+        if not ts_parts:
+            return Bars.empty(td_interval)
+        bars = Bars(
+            np.concatenate(ts_parts),
+            {c: np.concatenate(parts) for c, parts in col_parts.items()},
+            td_interval,
+        )
+        if len(ts_parts) > 1:
+            # Stable sort keeps block order, so the last duplicate is the newest write
+            bars = bars.sorted()
+        return bars
+
+    def _open_blocks(self, path: str):
+        """Memory-map ``path``; returns ``(mm, blocks)`` or ``None`` when empty or unreadable."""
+        if not os.path.exists(path) or os.path.getsize(path) <= len(FILE_MAGIC):
+            return None
+        mm = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(mm[:len(FILE_MAGIC)]) != FILE_MAGIC:
+            logger.warning(f"Ignoring bar store file with bad header: {path}")
+            return None
+        return mm, list(self._blocks(mm))
+
+    def read(self, symbol: str, td_interval: str, start_dt: datetime = None, end_dt: datetime = None):
+        """Return ``(bars, coverage)`` for bars in ``[start_dt, end_dt]``, or ``None``.
+
+        ``coverage`` is the continuous (start, end) epoch-second window the
+        file has fetched that overlaps the request, the latest one if
+        several do. It may extend beyond the bars themselves. Bars are
+        limited to that window, so a gap between two separate fetches is
+        never reported as covered.
+        """
+        opened = self._open_blocks(self.path(symbol, td_interval))
+        if opened is None:
+            return None
+        mm, blocks = opened
+        lo_ts = epoch_seconds(start_dt) if start_dt is not None else np.iinfo(np.int64).min
+        hi_ts = epoch_seconds(end_dt) if end_dt is not None else np.iinfo(np.int64).max
+        try:
+            spans = [s for s in merge_ranges((b[1], b[2]) for b in blocks) if s[0] <= hi_ts and s[1] >= lo_ts]
+            if not spans:
+                return None
+            cov_start, cov_end = spans[-1]
+            bars = self._slice(mm, blocks, max(lo_ts, cov_start), min(hi_ts, cov_end), td_interval)
+        finally:
+            del mm
+        self.reads += 1
+        self.bars_read += len(bars)
+        return bars, (cov_start, cov_end)
+
+    # ---- writing ----
+
+    def _encode_block(self, bars: Bars, range_start: datetime, range_end: datetime) -> bytes:
+        bars = bars.sorted()
+        parts = [
+            BLOCK_HEADER.pack(BLOCK_MAGIC, len(bars), epoch_seconds(range_start), epoch_seconds(range_end)),
+            bars.ts.astype("<i8").tobytes(),
+        ]
+        for col in COLUMNS:
+            parts.append(bars.columns[col].astype("<f8").tobytes())
+        return b"".join(parts)
+
+    @contextmanager
+    def _locked(self, path: str):
+        """Open ``path`` for appending under an exclusive flock.
+
+        A compaction may replace the file while we wait for the lock. The
+        handle is then reopened, so writes never land in the unlinked file.
+        """
+        while True:
+            f = open(path, "a+b")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                if os.path.exists(path) and os.path.samestat(os.fstat(f.fileno()), os.stat(path)):
+                    break
+            except BaseException:
+                f.close()
+                raise
+            f.close()
+        try:
+            yield f
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
+
+    def append(self, symbol: str, td_interval: str, bars: Bars, range_start: datetime, range_end: datetime):
+        """Append bars fetched for ``[range_start, range_end]`` as a new block."""
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path(symbol, td_interval)
+        block = self._encode_block(bars, range_start, range_end)
+        with self._locked(path) as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                f.write(FILE_MAGIC)
+                blocks = 0
+            else:
+                valid, blocks = self._scan(f, size)
+                if valid < size:
+                    f.truncate(valid)
+            f.write(block)
+            f.flush()
+            os.fsync(f.fileno())
+        self.appends += 1
+        self.bars_written += len(bars)
+        if blocks + 1 > MAX_BLOCKS:
+            self.compact(symbol, td_interval)
+
+    def compact(self, symbol: str, td_interval: str):
+        """Rewrite a file as one deduplicated block per coverage window (atomic replace).
+
+        The flock is held from the read through the replace, so an append
+        cannot slip in between and be lost.
+        """
+        path = self.path(symbol, td_interval)
+        if not os.path.exists(path):
+            return
+        with self._locked(path):
+            opened = self._open_blocks(path)
+            if opened is None:
+                return
+            mm, blocks = opened
+            try:
+                spans = merge_ranges((b[1], b[2]) for b in blocks)
+                encoded = [
+                    self._encode_block(self._slice(mm, blocks, lo, hi, td_interval), from_epoch(lo), from_epoch(hi))
+                    for lo, hi in spans
+                ]
+            finally:
+                del mm
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(FILE_MAGIC)
+                for block in encoded:
+                    f.write(block)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        self.compactions += 1
+
+    def stats(self) -> dict:
+        files = []
+        if os.path.isdir(self.root):
+            files = [f for f in os.listdir(self.root) if f.endswith(".bars")]
+        return {
+            "dir": self.root,
+            "files": len(files),
+            "reads": self.reads,
+            "bars_read": self.bars_read,
+            "appends": self.appends,
+            "bars_written": self.bars_written,
+            "compactions": self.compactions,
+        }
+
+
+def merge_ranges(ranges) -> list:
+    """Merge ``(start, end)`` windows that overlap or touch into sorted, disjoint ones."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+bar_store = BarStore()
+
+
+# ---- OFFLINE BACKFILL ----
+
+def _load_backfill_file(path: str):
+    """Read ``{symbol: [records]}`` from a JSON file or a CSV with a Symbol column."""
+    if path.endswith(".csv"):
+        by_symbol = {}
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                record = {"Date": row["Date"]}
+                for col in COLUMNS:
+                    value = row.get(col)
+                    record[col] = float(value) if value not in (None, "") else None
+                by_symbol.setdefault(row["Symbol"].upper(), []).append(record)
+        return by_symbol
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        # Flat list of records each carrying its own Symbol
+        by_symbol = {}
+        for record in data:
+            by_symbol.setdefault(record["Symbol"].upper(), []).append(record)
+        return by_symbol
+    return {symbol.upper(): records for symbol, records in data.items()}
+
+
+def backfill_from_file(path: str, interval: str = "1d", symbols=None, store: BarStore = bar_store):
+    """Seed the store from a local file; returns bars written per symbol."""
+    td_interval = resolve_interval(interval)
+    wanted = {s.upper() for s in symbols} if symbols else None
+    written = {}
+    for symbol, records in _load_backfill_file(path).items():
+        if wanted is not None and symbol not in wanted:
+            continue
+        bars = Bars.from_records([r for r in records if r.get("Date")], td_interval)
+        if not len(bars):
+            continue
+        store.append(symbol, td_interval, bars, from_epoch(bars.ts[0]), from_epoch(bars.ts[-1]))
+        written[symbol] = len(bars)
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline bar store maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    backfill = sub.add_parser("backfill", help="Seed bars from a local JSON/CSV file")
+    backfill.add_argument("path")
+    backfill.add_argument("--interval", default="1d")
+    backfill.add_argument("--symbols", default="", help="Comma separated subset to import")
+    args = parser.parse_args()
+    subset = [s.strip() for s in args.symbols.split(",") if s.strip()]
+    result = backfill_from_file(args.path, args.interval, subset or None)
+    for sym, count in result.items():
+        print(f"{sym}: {count} bars")
@@ -0,0 +1,146 @@
+"""Columnar OHLCV series shared by the bar cache, bar store and routes.
+
+Bars are held as NumPy columns: ``ts`` (int64 epoch seconds, UTC) plus one
+float64 array per field, with NaN standing in for missing values. Parsing
+the upstream ``values`` payload, merging, slicing and serialising all work
+on whole columns; per-bar dicts are only built when a caller asks for the
+legacy record shape.
+"""
+import calendar
+from datetime import datetime, timezone
+import numpy as np
+
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+INTRADAY_INTERVALS = {"1min", "5min", "15min", "1h"}
+
+
+def parse_bar_date(value: str) -> datetime:
+    """Parse a Twelve Data ``datetime`` string (UTC) into a datetime."""
+    return datetime.fromisoformat(value)
+
+
+def to_naive_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def epoch_seconds(dt: datetime) -> int:
+    return calendar.timegm(to_naive_utc(dt).timetuple())
+
+
+def from_epoch(ts: int) -> datetime:
+    """Naive UTC datetime for an epoch-seconds timestamp."""
+    return datetime.fromtimestamp(int(ts), tz=timezone.utc).replace(tzinfo=None)
+
+
+def _to_epoch(dates) -> np.ndarray:
+    return np.array(dates, dtype="datetime64[s]").astype(np.int64)
+
+
+def _column(values, name: str) -> np.ndarray:
+    raw = [v.get(name) for v in values]
+    return np.array(["nan" if x is None else x for x in raw], dtype=np.float64)
+
+
+def nullable_list(column: np.ndarray):
+    """``tolist()`` with NaN mapped to None, for JSON."""
+    mask = np.isnan(column)
+    if not mask.any():
+        return column.tolist()
+    out = column.astype(object)
+    out[mask] = None
+    return out.tolist()
+
+
+class Bars:
+    __slots__ = ("ts", "columns", "td_interval")
+
+    def __init__(self, ts: np.ndarray, columns: dict, td_interval: str):
+        self.ts = ts
+        self.columns = columns
+        self.td_interval = td_interval
+
+    def __len__(self):
+        return len(self.ts)
+
+    @classmethod
+    def empty(cls, td_interval: str) -> "Bars":
+        return cls(np.empty(0, dtype=np.int64), {f: np.empty(0) for f in FIELDS}, td_interval)
+
+    @classmethod
+    def from_values(cls, values, td_interval: str) -> "Bars":
+        """Parse Twelve Data ``values`` (newest first, string fields) column-wise."""
+        if not values:
+            return cls.empty(td_interval)
+        values = values[::-1]  # ensure chronological order
+        ts = _to_epoch([v.get("datetime") for v in values])
+        columns = {f: _column(values, f.lower()) for f in FIELDS}
+        return cls(ts, columns, td_interval).sorted()
+
+    @classmethod
+    def from_records(cls, records, td_interval: str) -> "Bars":
+        """Build from ``/history``-shaped dicts (dates may carry a UTC offset)."""
+        if not records:
+            return cls.empty(td_interval)
+        ts = np.array(
+            [to_naive_utc(parse_bar_date(r["Date"])) for r in records], dtype="datetime64[s]"
+        ).astype(np.int64)
+        columns = {
+            f: np.array([np.nan if r.get(f) is None else float(r[f]) for r in records], dtype=np.float64)
+            for f in FIELDS
+        }
+        return cls(ts, columns, td_interval).sorted()
+
+    def sorted(self) -> "Bars":
+        """Sort by time, keeping the last of any duplicate timestamps."""
+        if len(self.ts) < 2 or (np.all(self.ts[1:] > self.ts[:-1])):
+            return self
+        order = np.argsort(self.ts, kind="stable")
+        ts = self.ts[order]
+        keep = np.append(ts[1:] != ts[:-1], True)
+        return Bars(ts[keep], {f: c[order][keep] for f, c in self.columns.items()}, self.td_interval)
+
+    def slice_ts(self, start_ts: int = None, end_ts: int = None) -> "Bars":
+        lo = 0 if start_ts is None else np.searchsorted(self.ts, start_ts, side="left")
+        hi = len(self.ts) if end_ts is None else np.searchsorted(self.ts, end_ts, side="right")
+        return Bars(self.ts[lo:hi], {f: c[lo:hi] for f, c in self.columns.items()}, self.td_interval)
+
+    def merge(self, other: "Bars") -> "Bars":
+        """Splice ``other`` in, replacing any bars within its time range."""
+        if not len(other):
+            return self
+        if not len(self):
+            return other
+        lo = np.searchsorted(self.ts, other.ts[0], side="left")
+        hi = np.searchsorted(self.ts, other.ts[-1], side="right")
+        ts = np.concatenate([self.ts[:lo], other.ts, self.ts[hi:]])
+        columns = {
+            f: np.concatenate([c[:lo], other.columns[f], c[hi:]]) for f, c in self.columns.items()
+        }
+        return Bars(ts, columns, self.td_interval)
+
+    def dates(self):
+        """Dates formatted the way Twelve Data returns them for this interval."""
+        stamps = self.ts.astype("datetime64[s]")
+        if self.td_interval in INTRADAY_INTERVALS:
+            return np.char.replace(np.datetime_as_string(stamps, unit="s"), "T", " ").tolist()
+        return np.datetime_as_string(stamps, unit="D").tolist()
+
+    def to_columnar(self) -> dict:
+        """One array per field (JSON-safe lists)."""
+        out = {"Date": self.dates()}
+        for f in FIELDS[:-1]:
+            out[f] = nullable_list(self.columns[f])
+        volume = self.columns["Volume"]
+        if np.isnan(volume).any():
+            out["Volume"] = [None if v != v else int(v) for v in volume.tolist()]
+        else:
+            out["Volume"] = volume.astype(np.int64).tolist()
+        return out
+
+    def to_records(self):
+        """Legacy per-bar dict shape served by ``/history``."""
+        cols = self.to_columnar()
+        keys = ("Date",) + FIELDS
+        return [dict(zip(keys, row)) for row in zip(*(cols[k] for k in keys))]
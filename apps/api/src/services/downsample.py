@@ -0,0 +1,76 @@
+"""Server-side reduction of history bars to chart resolution.
+
+Two methods, both operating on whole columns of a ``Bars`` series:
+
+- ``ohlc``: split the series into ``max_points`` equal-count buckets and
+  aggregate each into one bar (first open, highest high, lowest low, last
+  close, summed volume), so candles stay truthful.
+- ``lttb``: Largest-Triangle-Three-Buckets on the close series, which
+  keeps the original bars that best preserve the line's visual shape.
+"""
+import numpy as np
+from fastapi import HTTPException
+from src.services.bars import Bars
+
+METHODS = ("ohlc", "lttb")
+
+
+def ohlc_buckets(bars: Bars, max_points: int) -> Bars:
+    n = len(bars)
+    if n <= max_points:
+        return bars
+    starts = np.linspace(0, n, max_points, endpoint=False).astype(np.int64)
+    ends = np.append(starts[1:], n) - 1
+    cols = bars.columns
+    volume = np.nan_to_num(cols["Volume"])
+    columns = {
+        "Open": cols["Open"][starts],
+        "High": np.fmax.reduceat(cols["High"], starts),   # fmax/fmin skip NaN
+        "Low": np.fmin.reduceat(cols["Low"], starts),
+        "Close": cols["Close"][ends],
+        "Volume": np.add.reduceat(volume, starts),
+    }
+    return Bars(bars.ts[starts], columns, bars.td_interval)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points kept by Largest-Triangle-Three-Buckets."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = x.astype(np.float64)
+    y = np.nan_to_num(y.astype(np.float64))
+    # Interior points split into threshold - 2 buckets; first and last are always kept
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point for the final bucket)
+        if i + 2 < len(edges):
+            nxt = slice(edges[i + 1], edges[i + 2])
+            avg_x, avg_y = x[nxt].mean(), y[nxt].mean()
+        else:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def lttb(bars: Bars, max_points: int) -> Bars:
+    if len(bars) <= max_points:
+        return bars
+    idx = lttb_indices(bars.ts, bars.columns["Close"], max_points)
+    return Bars(bars.ts[idx], {f: c[idx] for f, c in bars.columns.items()}, bars.td_interval)
+
+
+def downsample(bars: Bars, max_points: int, method: str = "ohlc") -> Bars:
+    if method not in METHODS:
+        raise HTTPException(status_code=400, detail=f"Unknown downsample method '{method}'. Use one of: {', '.join(METHODS)}")
+    if method == "lttb":
+        return lttb(bars, max_points)
+    return ohlc_buckets(bars, max_points)
@@ -0,0 +1,125 @@
+"""Shared, app-scoped HTTP clients for upstream calls.
+
+One pooled ``httpx.AsyncClient`` is kept per upstream host so quotes and
+history requests reuse keep-alive connections instead of paying a fresh
+TCP+TLS handshake on every call. Clients are created on startup in
+``src/main.py`` (or lazily on first use, e.g. when an ML script runs
+standalone) and closed on shutdown.
+"""
+import os
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+TWELVE_DATA_BASE_URL = "https://api.twelvedata.com"
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _host_configs():
+    """Per-host settings. Timeouts are read from the environment per host."""
+    return {
+        "twelve_data": {
+            "base_url": TWELVE_DATA_BASE_URL,
+            "timeout": httpx.Timeout(
+                _env_float("TWELVE_DATA_TIMEOUT", 20.0),
+                connect=_env_float("TWELVE_DATA_CONNECT_TIMEOUT", 5.0),
+            ),
+            "http2": True,
+        },
+    }
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=_env_int("UPSTREAM_MAX_CONNECTIONS", 100),
+        max_keepalive_connections=_env_int("UPSTREAM_MAX_KEEPALIVE", 20),
+        keepalive_expiry=_env_float("UPSTREAM_KEEPALIVE_EXPIRY", 30.0),
+    )
+
+
+class UpstreamClients:
+    """Holds one pooled AsyncClient per upstream host."""
+
+    def __init__(self):
+        self._clients = {}
+        self.started = False
+
+    def _build(self, name: str) -> httpx.AsyncClient:
+        config = _host_configs()[name]
+        use_http2 = (
+            config["http2"]
+            and HTTP2_AVAILABLE
+            and os.getenv("UPSTREAM_HTTP2", "1") != "0"
+        )
+        return httpx.AsyncClient(
+            base_url=config["base_url"],
+            timeout=config["timeout"],
+            limits=_pool_limits(),
+            http2=use_http2,
+        )
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._build(name)
+            self._clients[name] = client
+        return client
+
+    async def startup(self):
+        for name in _host_configs():
+            self.get(name)
+        self.started = True
+
+    async def shutdown(self):
+        for client in list(self._clients.values()):
+            await client.aclose()
+        self._clients.clear()
+        self.started = False
+
+    def stats(self) -> dict:
+        """Connection pool usage per host, for sizing the pool limits."""
+        limits = _pool_limits()
+        report = {}
+        for name, client in self._clients.items():
+            # httpx does not expose pool stats publicly; read httpcore's pool
+            pool = getattr(getattr(client, "_transport", None), "_pool", None)
+            connections = list(getattr(pool, "connections", []) or [])
+            idle = sum(1 for c in connections if c.is_idle())
+            requests = list(getattr(pool, "_requests", []) or [])
+            report[name] = {
+                "base_url": str(client.base_url),
+                "http2": getattr(pool, "_http2", False),
+                "max_connections": limits.max_connections,
+                "max_keepalive_connections": limits.max_keepalive_connections,
+                "connections": len(connections),
+                "active": len(connections) - idle,
+                "idle": idle,
+                "in_flight_requests": len(requests),
+                "queued_requests": sum(1 for r in requests if r.is_queued()),
+                "closed": client.is_closed,
+            }
+        return report
+
+
+clients = UpstreamClients()
+
+
+def get_twelve_data_client() -> httpx.AsyncClient:
+    return clients.get("twelve_data")
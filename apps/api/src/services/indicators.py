@@ -0,0 +1,227 @@
+"""Streaming RSI/SMA/Bollinger state for the model's nine features.
+
+Each tracked (symbol, interval) keeps rolling state: the RSI's Wilder
+averages and a fixed window of closes with running sums for the SMA and
+Bollinger bands. Folding in one bar is constant time, and results match
+``ta`` (RSI: ewm with ``alpha=1/14, adjust=False``; bands: rolling mean
+and ``ddof=0`` std over 20 closes) to floating-point tolerance.
+
+The newest bar is held as a provisional head, because it may still be
+forming. The bar cache reports every upstream fetch here, and stream ticks
+update the head's high/low/close. The head is committed when a later bar
+arrives. ``tail`` returns the last N committed feature rows plus the head
+as last fetched, ignoring ticks, so a prediction does not depend on which
+tick happened to be current; ``latest`` (for ``/indicators``) includes them.
+Neither recomputes a year of history.
+
+A series is reseeded when a caller supplies bars that start earlier than
+the tracked ones, so a short first seed (e.g. ``period=1mo``) never leaves
+predictions with too few rows or a short RSI warm-up.
+"""
+import math
+import os
+import time
+from collections import deque
+import numpy as np
+from src.services.bar_cache import bar_cache
+from src.services.bars import FIELDS
+
+FEATURES = FIELDS + ("RSI_14", "SMA_20", "BB_High", "BB_Low")
+RSI_WINDOW = 14
+SMA_WINDOW = 20
+BB_DEV = 2
+# How long after a bar's timestamp stream ticks still belong to it
+BAR_SECONDS = {"1min": 60, "5min": 300, "15min": 900, "1h": 3600, "1day": 86400}
+
+
+class IndicatorState:
+    def __init__(self, td_interval: str, tail: int):
+        self.td_interval = td_interval
+        self.count = 0
+        self.prev_close = math.nan
+        self.avg_up = 0.0
+        self.avg_dn = 0.0
+        self.closes = deque(maxlen=SMA_WINDOW)
+        # Sums of (close - ref) and its square; re-based every window to bound drift
+        self.ref = 0.0
+        self.s1 = 0.0
+        self.s2 = 0.0
+        self.since_resync = 0
+        self.head = None        # [ts, open, high, low, close, volume], with stream ticks
+        self.fetched = None     # the head as last fetched, without ticks
+        self.first_ts = None
+        self.rows = deque(maxlen=tail)  # (ts, float64[9]) complete committed rows
+        self.last_ts = None
+        self.updated_at = time.time()
+
+    def _indicators(self, close: float, commit: bool):
+        alpha = 1.0 / RSI_WINDOW
+        if self.count == 0:
+            up = dn = 0.0   # ta treats the first (NaN) diff as no move
+            avg_up = avg_dn = 0.0
+        else:
+            diff = close - self.prev_close
+            up, dn = max(diff, 0.0), max(-diff, 0.0)
+            avg_up = self.avg_up + alpha * (up - self.avg_up)
+            avg_dn = self.avg_dn + alpha * (dn - self.avg_dn)
+        count = self.count + 1
+        if count < RSI_WINDOW:
+            rsi = math.nan
+        elif avg_dn == 0:
+            rsi = 100.0
+        else:
+            rsi = 100.0 - 100.0 / (1.0 + avg_up / avg_dn)
+
+        x = close - self.ref
+        s1, s2, n = self.s1 + x, self.s2 + x * x, len(self.closes) + 1
+        if len(self.closes) == SMA_WINDOW:
+            old = self.closes[0] - self.ref
+            s1, s2, n = s1 - old, s2 - old * old, SMA_WINDOW
+        if n < SMA_WINDOW:
+            sma = upper = lower = math.nan
+        else:
+            mean = s1 / n
+            std = math.sqrt(max(s2 / n - mean * mean, 0.0))
+            sma = self.ref + mean
+            upper, lower = sma + BB_DEV * std, sma - BB_DEV * std
+
+        if commit:
+            self.count, self.prev_close = count, close
+            self.avg_up, self.avg_dn = avg_up, avg_dn
+            self.closes.append(close)
+            self.s1, self.s2 = s1, s2
+            self.since_resync += 1
+            if self.since_resync >= SMA_WINDOW:
+                self._resync()
+        return rsi, sma, upper, lower
+
+    def _resync(self):
+        self.ref = self.closes[-1]
+        shifted = [c - self.ref for c in self.closes]
+        self.s1 = sum(shifted)
+        self.s2 = sum(x * x for x in shifted)
+        self.since_resync = 0
+
+    def _row(self, bar, commit: bool) -> np.ndarray:
+        ts, o, h, l, c, v = bar
+        return np.array([o, h, l, c, v, *self._indicators(c, commit)], dtype=np.float64)
+
+    def _commit_head(self):
+        head, self.head = self.head, None
+        if math.isnan(head[4]):
+            return
+        row = self._row(head, commit=True)
+        if np.isfinite(row).all():
+            self.rows.append((head[0], row))
+
+    def apply(self, ts: np.ndarray, columns: dict):
+        """Fold chronological bars in; older bars than the head are ignored."""
+        cols = [columns[f] for f in FIELDS]
+        start = 0 if self.head is None else int(np.searchsorted(ts, self.head[0], side="left"))
+        for i in range(start, len(ts)):
+            bar = [int(ts[i]), *(float(c[i]) for c in cols)]
+            if self.head is not None and bar[0] > self.head[0]:
+                self._commit_head()
+            self.head, self.fetched = bar, list(bar)
+            self.last_ts = bar[0]
+            if self.first_ts is None:
+                self.first_ts = bar[0]
+        self.updated_at = time.time()
+
+    def tick(self, price: float, at: float) -> bool:
+        period = BAR_SECONDS.get(self.td_interval)
+        if self.head is None or period is None or not (0 <= at - self.head[0] < period):
+            return False
+        head = self.head
+        head[2] = price if math.isnan(head[2]) else max(head[2], price)
+        head[3] = price if math.isnan(head[3]) else min(head[3], price)
+        head[4] = price
+        self.updated_at = time.time()
+        return True
+
+    def tail(self, n: int):
+        """Last ``n`` feature rows as ``(n, 9)`` float32, or ``None`` if fewer exist.
+
+        Committed rows, then the head as last fetched; stream ticks are left out.
+        """
+        rows = [r for _, r in self.rows]
+        if self.fetched is not None and not math.isnan(self.fetched[4]):
+            head_row = self._row(self.fetched, commit=False)
+            if np.isfinite(head_row).all():
+                rows.append(head_row)
+        if len(rows) < n:
+            return None
+        return np.asarray(rows[-n:], dtype=np.float32)
+
+    def latest(self) -> dict:
+        """Feature values of the head including stream ticks."""
+        if self.head is None:
+            return None
+        row = self._row(self.head, commit=False)
+        return {f: (None if math.isnan(x) else float(x)) for f, x in zip(FEATURES, row)}
+
+
+class IndicatorEngine:
+    def __init__(self, tail: int = None):
+        self.tail_rows = tail or int(os.getenv("INDICATOR_TAIL_BARS", 256))
+        self._states = {}   # (symbol, td_interval) -> IndicatorState
+        self.seeded = 0
+        self.bar_updates = 0
+        self.ticks = 0
+
+    def track(self, symbol: str, td_interval: str, bars) -> IndicatorState:
+        """Seed state for ``symbol`` from ``bars``.
+
+        A tracked series is kept unless ``bars`` start earlier than it does;
+        then it is reseeded, so the longest history supplied sets the warm-up.
+        """
+        key = (symbol.upper(), td_interval)
+        state = self._states.get(key)
+        if state is None or (len(bars) and state.first_ts is not None and int(bars.ts[0]) < state.first_ts):
+            state = IndicatorState(td_interval, self.tail_rows)
+            state.apply(bars.ts, bars.columns)
+            self._states[key] = state
+            self.seeded += 1
+        return state
+
+    def observe(self, symbol: str, td_interval: str, bars):
+        """Bar cache listener: fold freshly fetched bars into a tracked series."""
+        state = self._states.get((symbol.upper(), td_interval))
+        if state is not None and len(bars):
+            state.apply(bars.ts, bars.columns)
+            self.bar_updates += 1
+
+    def on_tick(self, symbol: str, price: float, at: float = None):
+        at = time.time() if at is None else at
+        symbol = symbol.upper()
+        for (sym, _), state in self._states.items():
+            if sym == symbol and state.tick(price, at):
+                self.ticks += 1
+
+    def get(self, symbol: str, td_interval: str):
+        return self._states.get((symbol.upper(), td_interval))
+
+    def window(self, symbol: str, td_interval: str, bars, n: int) -> np.ndarray:
+        """The last ``n`` feature rows, seeding from ``bars`` on first use."""
+        window = self.track(symbol, td_interval, bars).tail(n)
+        if window is None:
+            raise ValueError("Not enough data for prediction window.")
+        return window
+
+    def untrack(self, symbol: str = None):
+        for key in list(self._states):
+            if symbol is None or key[0] == symbol.upper():
+                del self._states[key]
+
+    def stats(self) -> dict:
+        return {
+            "series": len(self._states),
+            "tail_rows": self.tail_rows,
+            "seeded": self.seeded,
+            "bar_updates": self.bar_updates,
+            "ticks": self.ticks,
+        }
+
+
+indicator_engine = IndicatorEngine()
+bar_cache.add_listener(indicator_engine.observe)
@@ -0,0 +1,108 @@
+"""Twelve Data request helpers shared by the market routes, caches and ML."""
+import os
+from datetime import datetime, timedelta, timezone
+import httpx
+from fastapi import HTTPException
+from src.services.http_client import get_twelve_data_client
+from src.services.singleflight import upstream_flights
+from src.services.rate_limiter import Priority, rate_limiter
+from src.services.bars import Bars, to_naive_utc
+
+# Map to Twelve Data interval values
+INTERVAL_MAP = {
+    "1m": "1min",
+    "5m": "5min",
+    "15m": "15min",
+    "1h": "1h",
+    "1d": "1day",
+    "1wk": "1week",
+    "1mo": "1month",
+}
+
+PERIOD_MAP = {
+    "1d": timedelta(days=1),
+    "5d": timedelta(days=5),
+    "1mo": timedelta(days=30),
+    "6mo": timedelta(days=182),
+    "1y": timedelta(days=365),
+    "5y": timedelta(days=365 * 5),
+}
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def resolve_interval(interval: str) -> str:
+    # Accept both our short codes and native Twelve Data values
+    if interval in INTERVAL_MAP.values():
+        return interval
+    return INTERVAL_MAP.get(interval, "1day")
+
+
+def resolve_range(period: str):
+    """Return the (start, end) UTC datetimes covered by ``period``."""
+    delta = PERIOD_MAP.get(period, timedelta(days=30))
+    end_dt = datetime.now(timezone.utc)
+    return end_dt - delta, end_dt
+
+
+def get_api_key() -> str:
+    api_key = os.getenv("TWELVE_DATA_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="TWELVE_DATA_API_KEY not configured")
+    return api_key
+
+
+def credit_cost(params: dict) -> int:
+    """Twelve Data charges one credit per requested symbol."""
+    return max(1, len([s for s in str(params.get("symbol", "")).split(",") if s.strip()]))
+
+
+async def _get_json(path: str, params: dict, timeout, priority: Priority):
+    await rate_limiter.acquire(credit_cost(params), priority)
+    client = get_twelve_data_client()
+    resp = await client.get(path, params=params, timeout=timeout)
+    if resp.status_code == 429:
+        rate_limiter.penalize()
+    if resp.status_code != 200:
+        raise HTTPException(status_code=resp.status_code, detail=resp.text)
+    return resp.json()
+
+
+async def twelve_data_get(
+    path: str, params: dict, timeout=httpx.USE_CLIENT_DEFAULT, priority: Priority = Priority.INTERACTIVE
+):
+    """GET a Twelve Data endpoint and return the parsed JSON body.
+
+    Identical concurrent calls (same path and params, ignoring the API key)
+    share one upstream request, which spends credits once at the priority
+    of the first caller. Callers must treat the result as read-only.
+    ``timeout`` defaults to the client's ``TWELVE_DATA_TIMEOUT`` and
+    ``TWELVE_DATA_CONNECT_TIMEOUT``.
+    """
+    key = (path, tuple(sorted((k, str(v)) for k, v in params.items() if k != "apikey")))
+    return await upstream_flights.do(key, lambda: _get_json(path, params, timeout, priority))
+
+
+async def fetch_time_series(
+    symbol: str,
+    td_interval: str,
+    start_dt: datetime,
+    end_dt: datetime,
+    priority: Priority = Priority.HISTORY,
+):
+    """Fetch OHLCV bars for ``[start_dt, end_dt]`` in chronological order."""
+    params = {
+        "symbol": symbol.upper(),
+        "interval": td_interval,
+        "start_date": to_naive_utc(start_dt).strftime(DATE_FORMAT),
+        "end_date": to_naive_utc(end_dt).strftime(DATE_FORMAT),
+        "timezone": "UTC",
+        "apikey": get_api_key(),
+    }
+    data = await twelve_data_get("/time_series", params, priority=priority)
+    if data.get("status") not in ("ok", None) or "values" not in data:
+        # Errors arrive as HTTP 200 with a body code; only "no data" is a 404
+        code = data.get("code")
+        status = code if code == 429 or (isinstance(code, int) and code >= 500) else 404
+        raise HTTPException(status_code=status, detail=data.get("message", "no data"))
+    return Bars.from_values(data.get("values", []), td_interval)
@@ -0,0 +1,61 @@
+"""In-process book of the latest streamed prices.
+
+The WebSocket listener writes every Twelve Data tick here; REST quote
+lookups read it and only go upstream when the symbol is not streamed or
+its last tick is older than ``PRICE_BOOK_MAX_AGE_SECONDS``.
+"""
+import os
+import time
+from src.services.quote_batcher import quote_batcher
+
+
+class PriceBook:
+    def __init__(self, max_age: float = None):
+        self.max_age = max_age if max_age is not None else float(os.getenv("PRICE_BOOK_MAX_AGE_SECONDS", 5))
+        self._prices = {}  # symbol -> (price, monotonic time of tick)
+        self.ticks = 0
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+
+    def update(self, symbol: str, price: float):
+        self._prices[symbol.upper()] = (float(price), time.monotonic())
+        self.ticks += 1
+
+    def discard(self, symbol: str):
+        self._prices.pop(symbol.upper(), None)
+
+    def get(self, symbol: str, max_age: float = None):
+        """Return ``(price, age_seconds)`` if a fresh tick is held, else ``None``."""
+        entry = self._prices.get(symbol.upper())
+        if entry is None:
+            self.misses += 1
+            return None
+        price, at = entry
+        age = time.monotonic() - at
+        if age > (self.max_age if max_age is None else max_age):
+            self.stale += 1
+            return None
+        self.hits += 1
+        return price, age
+
+    def stats(self) -> dict:
+        return {
+            "max_age_seconds": self.max_age,
+            "symbols": len(self._prices),
+            "ticks": self.ticks,
+            "hits": self.hits,
+            "stale": self.stale,
+            "misses": self.misses,
+        }
+
+
+price_book = PriceBook()
+
+
+async def get_live_price(symbol: str):
+    """Return ``(price, source)``: the streamed price when fresh, otherwise a REST lookup."""
+    fresh = price_book.get(symbol)
+    if fresh is not None:
+        return fresh[0], "stream"
+    return await quote_batcher.get_price(symbol), "rest"
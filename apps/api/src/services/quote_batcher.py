@@ -0,0 +1,85 @@
+"""Micro-batching of single-symbol price lookups.
+
+Single-symbol quote requests are collected for a short window
+(``QUOTE_BATCH_WINDOW_MS``) or until ``QUOTE_BATCH_MAX_SIZE`` distinct
+symbols are waiting, then sent as one comma-separated Twelve Data
+``/price`` call. Each caller gets its own symbol's price back.
+"""
+import asyncio
+import os
+from fastapi import HTTPException
+from src.services.market_data import get_api_key, twelve_data_get
+
+
+class QuoteBatcher:
+    def __init__(self, window_ms: float = None, max_batch: int = None):
+        self.window = (window_ms if window_ms is not None else float(os.getenv("QUOTE_BATCH_WINDOW_MS", 10))) / 1000
+        self.max_batch = max_batch or int(os.getenv("QUOTE_BATCH_MAX_SIZE", 50))
+        self._pending = {}  # symbol -> future shared by every caller of that symbol
+        self._timer = None
+        self._flushes = set()
+        self.requests = 0
+        self.batches = 0
+        self.symbols_sent = 0
+
+    async def get_price(self, symbol: str) -> float:
+        symbol = symbol.upper()
+        self.requests += 1
+        future = self._pending.get(symbol)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[symbol] = future
+            if len(self._pending) >= self.max_batch:
+                self._schedule_flush()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.window, self._schedule_flush)
+        return await asyncio.shield(future)
+
+    def _schedule_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: dict):
+        symbols = list(batch)
+        self.batches += 1
+        self.symbols_sent += len(symbols)
+        try:
+            params = {"symbol": ",".join(symbols), "apikey": get_api_key()}
+            data = await twelve_data_get("/price", params)
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for symbol, future in batch.items():
+            if future.done():
+                continue
+            # A one-symbol call returns the quote itself, not a dict keyed by symbol
+            entry = data if len(symbols) == 1 else data.get(symbol)
+            if entry and "price" in entry:
+                future.set_result(float(entry["price"]))
+            else:
+                # Twelve Data may return an error object with code/message
+                message = (entry or {}).get("message") or entry or "no data found"
+                future.set_exception(HTTPException(status_code=404, detail=str(message)))
+
+    def stats(self) -> dict:
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "requests": self.requests,
+            "batches": self.batches,
+            "symbols_sent": self.symbols_sent,
+            "avg_batch_size": round(self.symbols_sent / self.batches, 2) if self.batches else 0.0,
+            "pending": len(self._pending),
+        }
+
+
+quote_batcher = QuoteBatcher()
@@ -0,0 +1,167 @@
+"""Credit-aware scheduler for Twelve Data calls.
+
+All upstream calls draw from one token bucket sized to the account's
+per-minute credit quota (``TWELVE_DATA_CREDITS_PER_MINUTE``). Twelve Data
+charges one credit per symbol on ``/price``, ``/quote`` and
+``/time_series``, so a batched call costs as many credits as it has
+symbols.
+
+Callers queue in priority lanes. A lane is served only when every higher
+lane is empty, and the low-priority lanes must leave a reserve of credits
+in the bucket, so ML training and background refreshes cannot starve the
+quote and chart requests users are waiting on. When their queue is full
+or they wait too long, low-priority calls are shed with a 503 rather
+than being allowed to push the account into upstream 429s.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from enum import IntEnum
+from fastapi import HTTPException
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0   # quotes a user is waiting on
+    HISTORY = 1       # chart history
+    BACKGROUND = 2    # periodic refreshes
+    TRAINING = 3      # ML training / batch data
+
+
+# reserve: fraction of the bucket that must remain after this lane takes credits
+# max_queue / max_wait: shed beyond these (None = never shed)
+LANES = {
+    Priority.INTERACTIVE: {"reserve": 0.0, "max_queue": None, "max_wait": None},
+    Priority.HISTORY: {"reserve": 0.0, "max_queue": None, "max_wait": None},
+    Priority.BACKGROUND: {"reserve": 0.25, "max_queue": 50, "max_wait": 30.0},
+    Priority.TRAINING: {"reserve": 0.5, "max_queue": 20, "max_wait": 120.0},
+}
+
+
+class CreditRateLimiter:
+    def __init__(self, credits_per_minute: float = None):
+        self.capacity = credits_per_minute or float(os.getenv("TWELVE_DATA_CREDITS_PER_MINUTE", 8))
+        self.refill_rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._queues = {p: deque() for p in Priority}
+        self._timer = None
+        self._lane_stats = {
+            p: {"granted": 0, "shed": 0, "credits": 0, "total_wait": 0.0, "max_wait": 0.0}
+            for p in Priority
+        }
+        self.upstream_429s = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.refill_rate)
+        self._updated = now
+
+    def _needed(self, cost: float, priority: Priority) -> float:
+        # A call costing more than the whole bucket waits for a full bucket and goes into debt
+        reserve = LANES[priority]["reserve"] * self.capacity
+        return min(cost, self.capacity) + reserve
+
+    def _grant(self, cost: float, priority: Priority, waited: float):
+        self.tokens -= cost
+        stats = self._lane_stats[priority]
+        stats["granted"] += 1
+        stats["credits"] += cost
+        stats["total_wait"] += waited
+        stats["max_wait"] = max(stats["max_wait"], waited)
+
+    def _shed(self, priority: Priority, reason: str):
+        self._lane_stats[priority]["shed"] += 1
+        raise HTTPException(
+            status_code=503,
+            detail=f"Upstream credit budget exhausted for {priority.name.lower()} requests ({reason}); retry later",
+        )
+
+    async def acquire(self, cost: float = 1, priority: Priority = Priority.INTERACTIVE):
+        """Wait until ``cost`` credits can be spent at ``priority``."""
+        self._refill()
+        ahead = any(self._queues[p] for p in Priority if p <= priority)
+        if not ahead and self.tokens >= self._needed(cost, priority):
+            self._grant(cost, priority, 0.0)
+            return
+
+        lane = LANES[priority]
+        queue = self._queues[priority]
+        if lane["max_queue"] is not None and len(queue) >= lane["max_queue"]:
+            self._shed(priority, "queue full")
+        waiter = (cost, asyncio.get_running_loop().create_future(), time.monotonic())
+        queue.append(waiter)
+        self._pump()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter[1]), lane["max_wait"])
+        except asyncio.TimeoutError:
+            self._discard(priority, waiter)
+            self._shed(priority, "wait timeout")
+        except asyncio.CancelledError:
+            self._discard(priority, waiter)
+            raise
+
+    def _discard(self, priority: Priority, waiter):
+        cost, future, _ = waiter
+        if future.done() and not future.cancelled():
+            self.tokens += cost  # granted but never used
+        else:
+            future.cancel()
+            try:
+                self._queues[priority].remove(waiter)
+            except ValueError:
+                pass
+        self._pump()
+
+    def _pump(self):
+        """Grant queued waiters in strict priority order, then sleep until the next can go."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._refill()
+        for priority in Priority:
+            queue = self._queues[priority]
+            while queue:
+                cost, future, enqueued = queue[0]
+                if future.done():
+                    queue.popleft()
+                    continue
+                needed = self._needed(cost, priority)
+                if self.tokens < needed:
+                    delay = (needed - self.tokens) / self.refill_rate
+                    self._timer = asyncio.get_running_loop().call_later(delay, self._pump)
+                    return
+                queue.popleft()
+                self._grant(cost, priority, time.monotonic() - enqueued)
+                future.set_result(None)
+
+    def penalize(self):
+        """Upstream answered 429: drain the bucket so everyone backs off for a refill."""
+        self.upstream_429s += 1
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+    def stats(self) -> dict:
+        self._refill()
+        lanes = {}
+        for priority, stats in self._lane_stats.items():
+            queue = self._queues[priority]
+            oldest = time.monotonic() - queue[0][2] if queue else 0.0
+            lanes[priority.name.lower()] = {
+                "queue_depth": len(queue),
+                "oldest_wait": round(oldest, 3),
+                "granted": stats["granted"],
+                "shed": stats["shed"],
+                "credits": stats["credits"],
+                "avg_wait": round(stats["total_wait"] / stats["granted"], 3) if stats["granted"] else 0.0,
+                "max_wait": round(stats["max_wait"], 3),
+            }
+        return {
+            "credits_per_minute": self.capacity,
+            "tokens": round(self.tokens, 3),
+            "upstream_429s": self.upstream_429s,
+            "lanes": lanes,
+        }
+
+
+rate_limiter = CreditRateLimiter()
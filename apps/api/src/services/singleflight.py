@@ -0,0 +1,42 @@
+"""In-flight deduplication of identical upstream calls.
+
+Concurrent callers asking for the same key await one shared task and get
+its result (or its exception). The task is shielded, so a caller whose
+request is cancelled does not cancel the call for everyone else.
+"""
+import asyncio
+
+
+class SingleFlight:
+    def __init__(self):
+        self._in_flight = {}
+        self.calls = 0
+        self.collapsed = 0
+
+    async def do(self, key, fn):
+        """Run ``fn()`` once for all concurrent callers of ``key``."""
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.collapsed += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        self._in_flight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every caller went away
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "collapsed": self.collapsed,
+            "upstream_calls": self.calls - self.collapsed,
+            "in_flight": len(self._in_flight),
+        }
+
+
+upstream_flights = SingleFlight()
@@ -3,8 +3,11 @@ import os
 import asyncio
 import websockets
 import json
-import httpx
 from jose import jwt
+from src.services.market_data import twelve_data_get
+from src.services.rate_limiter import Priority
+from src.services.price_book import price_book
+from src.services.indicators import indicator_engine
 
 API_KEY = os.getenv("TWELVE_DATA_API_KEY")
 
@@ -80,6 +83,10 @@ class ConnectionManager:
                         symbol = data.get('symbol')
                         current_price = float(data.get('price', 0))
                         print(f"Price update for {symbol}: ${current_price}")
+                        # Share the tick with REST quote lookups
+                        if current_price > 0:
+                            price_book.update(symbol, current_price)
+                            indicator_engine.on_tick(symbol, current_price)
                         
                         # Get comprehensive quote data if we don't have it or it's stale
                         quote_data = self.quote_data.get(symbol)
@@ -162,7 +169,7 @@ class ConnectionManager:
             print(f"Subscribing to {symbol} on Twelve Data WebSocket")
             
             # Fetch comprehensive quote data first
-            quote_data = await get_comprehensive_quote(symbol)
+            quote_data = await get_comprehensive_quote(symbol, priority=Priority.INTERACTIVE)
             if quote_data:
                 self.quote_data[symbol] = quote_data
                 print(f"Fetched initial quote data for {symbol}: {quote_data}")
@@ -197,25 +204,22 @@ class ConnectionManager:
             }
             await self.twelve_data_ws.send(json.dumps(unsubscribe_message))
             self.subscribed_symbols.discard(symbol)
+            price_book.discard(symbol)
 
-async def get_comprehensive_quote(symbol):
+async def get_comprehensive_quote(symbol, priority=Priority.BACKGROUND):
     """Get comprehensive quote data including high, low, change, etc."""
     try:
-        url = f"https://api.twelvedata.com/quote?symbol={symbol}&apikey={API_KEY}"
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(url)
-            if resp.status_code == 200:
-                data = resp.json()
-                if "close" in data and "high" in data and "low" in data:
-                    return {
-                        "current": float(data.get("close", 0)),
-                        "high": float(data.get("high", 0)),
-                        "low": float(data.get("low", 0)),
-                        "change": float(data.get("change", 0)),
-                        "percent_change": float(data.get("percent_change", 0)),
-                        "open": float(data.get("open", 0)),
-                        "volume": int(float(data.get("volume", 0))) if data.get("volume") else 0
-                    }
+        data = await twelve_data_get("/quote", {"symbol": symbol, "apikey": API_KEY}, priority=priority)
+        if "close" in data and "high" in data and "low" in data:
+            return {
+                "current": float(data.get("close", 0)),
+                "high": float(data.get("high", 0)),
+                "low": float(data.get("low", 0)),
+                "change": float(data.get("change", 0)),
+                "percent_change": float(data.get("percent_change", 0)),
+                "open": float(data.get("open", 0)),
+                "volume": int(float(data.get("volume", 0))) if data.get("volume") else 0
+            }
     except Exception:
         pass
     return None
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Tests import the app as ``src.*``, the same way it runs from apps/api
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
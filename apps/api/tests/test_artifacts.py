@@ -0,0 +1,50 @@
+"""Artifact store retention: full-precision Keras files of older quantized versions are pruned."""
+import os
+import pytest
+from src.ml.artifacts import BUNDLE_FILES, ArtifactStore
+
+
+def _publish(store, workdir, n: int, lite: dict):
+    files = {}
+    for key, name in BUNDLE_FILES.items():
+        path = os.path.join(workdir, f"{n}-{name}")
+        with open(path, "wb") as f:
+            f.write(f"{key} {n}".encode() * (100 if key == "model" else 1))
+        files[key] = path
+    return store.publish("TEST", files, {"lite": lite})
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("MODEL_PRUNE_KERAS", "1")
+    return ArtifactStore(root=str(tmp_path / "store"), keep=5)
+
+
+def test_older_quantized_versions_drop_keras(store, tmp_path):
+    first = _publish(store, str(tmp_path), 1, {"precision": "int8", "max_abs_drift": 1e-3})
+    latest = _publish(store, str(tmp_path), 2, {"precision": "int8", "max_abs_drift": 1e-3})
+
+    old = store.bundle("TEST", first)
+    assert "model" not in old and set(old) == {"lite", "feat_scaler", "tgt_scaler"}
+    assert store.meta("TEST", first)["keras_pruned"] is True
+    # Fine-tuning warm-starts from the latest, which keeps its Keras file
+    assert "model" in store.latest("TEST") and store.latest_version("TEST") == latest
+    assert store.stats()["keras_pruned"] == 1
+
+
+@pytest.mark.parametrize("lite", [{"precision": "float32"}, {"precision": "int8", "fallback": "float32"}])
+def test_full_precision_exports_keep_keras(store, tmp_path, lite):
+    first = _publish(store, str(tmp_path), 1, lite)
+    _publish(store, str(tmp_path), 2, lite)
+
+    assert "model" in store.bundle("TEST", first)
+    assert store.stats()["keras_pruned"] == 0
+
+
+def test_pruning_can_be_turned_off(tmp_path, monkeypatch):
+    monkeypatch.setenv("MODEL_PRUNE_KERAS", "0")
+    store = ArtifactStore(root=str(tmp_path / "store"))
+    first = _publish(store, str(tmp_path), 1, {"precision": "float16"})
+    _publish(store, str(tmp_path), 2, {"precision": "float16"})
+
+    assert "model" in store.bundle("TEST", first)
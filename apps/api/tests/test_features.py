@@ -0,0 +1,70 @@
+"""Streaming indicator engine parity with the batch ``ta`` feature pipeline."""
+import numpy as np
+import pytest
+
+pytest.importorskip("ta")
+
+from src.ml.benchmark import synthetic_frame  # noqa: E402
+from src.ml.features import SEQ_LEN, feature_matrix  # noqa: E402
+from src.services.bars import Bars  # noqa: E402
+from src.services.indicators import IndicatorEngine, IndicatorState  # noqa: E402
+
+# Relative, against max(|value|, 1): float32 rounding is ~6e-8
+TOLERANCE = 1e-5
+
+
+@pytest.mark.parametrize("bars,seed", [(120, 0), (400, 1), (1000, 2)])
+def test_streamed_rows_match_feature_matrix(bars, seed):
+    df = synthetic_frame(bars, seed)
+    data, _ = feature_matrix(df.copy())
+    state = IndicatorState("1day", tail=len(data))
+    series = Bars.from_records(df.to_dict("records"), "1day")
+    state.apply(series.ts, series.columns)
+
+    streamed = state.tail(len(data))
+
+    assert streamed is not None, "engine produced fewer complete rows than the batch pipeline"
+    assert streamed.shape == data.shape
+    assert float(np.max(np.abs(streamed - data) / np.maximum(np.abs(data), 1.0))) < TOLERANCE
+
+
+def test_streamed_window_tracks_appended_bars():
+    df = synthetic_frame(300, 3)
+    series = Bars.from_records(df.to_dict("records"), "1day")
+    state = IndicatorState("1day", tail=60)
+    # Feed history in two chunks the way tail refreshes arrive
+    state.apply(series.ts[:250], {k: v[:250] for k, v in series.columns.items()})
+    state.apply(series.ts[250:], {k: v[250:] for k, v in series.columns.items()})
+
+    data, _ = feature_matrix(df.copy())
+
+    np.testing.assert_allclose(state.tail(60), data[-60:], rtol=TOLERANCE, atol=TOLERANCE)
+
+
+def test_short_seed_is_reseeded_by_a_longer_history():
+    df = synthetic_frame(260, 4)
+    series = Bars.from_records(df.to_dict("records"), "1day")
+    engine = IndicatorEngine(tail=256)
+    # A one-month /indicators call seeds first
+    short = series.slice_ts(int(series.ts[-21]))
+    engine.track("AAPL", "1day", short)
+
+    window = engine.window("AAPL", "1day", series, SEQ_LEN)
+
+    data, _ = feature_matrix(df.copy())
+    np.testing.assert_allclose(window, data[-SEQ_LEN:], rtol=TOLERANCE, atol=TOLERANCE)
+    assert engine.stats()["seeded"] == 2
+
+
+def test_ticks_move_latest_but_not_prediction_rows():
+    df = synthetic_frame(200, 5)
+    series = Bars.from_records(df.to_dict("records"), "1day")
+    state = IndicatorState("1day", tail=60)
+    state.apply(series.ts, series.columns)
+    before = state.tail(60)
+    close = state.latest()["Close"]
+
+    assert state.tick(close * 1.05, float(series.ts[-1]) + 60)
+
+    np.testing.assert_array_equal(state.tail(60), before)
+    assert state.latest()["Close"] == pytest.approx(close * 1.05)
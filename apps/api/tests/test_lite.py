@@ -0,0 +1,113 @@
+"""Lite runtime parity with Keras (single and stacked) and reduced-precision exports."""
+import joblib
+import numpy as np
+import pytest
+
+pytest.importorskip("tensorflow")
+
+from sklearn.preprocessing import MinMaxScaler  # noqa: E402
+from src.ml.features import SEQ_LEN  # noqa: E402
+from src.ml.lite import LiteModel, compare, export_checked, export_model  # noqa: E402
+from src.ml.model_predict import _predict_batch, build_model  # noqa: E402
+
+FEATURES = 9
+TOLERANCE = 1e-5
+
+
+def _keras_forward(model, x):
+    return model(x, training=False).numpy()
+
+
+@pytest.fixture(scope="module")
+def bundles(tmp_path_factory):
+    """Two untrained production-shaped models with scalers, saved as store bundles."""
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(0)
+    tmp = tmp_path_factory.mktemp("lite")
+    rng = np.random.default_rng(0)
+    out = []
+    for name in ("LITE_A", "LITE_B"):
+        model = build_model((SEQ_LEN, FEATURES))
+        feat_scaler = MinMaxScaler().fit(rng.normal(100, 10, (200, FEATURES)))
+        tgt_scaler = MinMaxScaler().fit(rng.normal(100, 10, (200, 1)))
+        paths = {
+            "model": str(tmp / f"{name}.keras"),
+            "feat_scaler": str(tmp / f"{name}_feat.pkl"),
+            "tgt_scaler": str(tmp / f"{name}_tgt.pkl"),
+            "lite": str(tmp / f"{name}.npz"),
+        }
+        model.save(paths["model"])
+        joblib.dump(feat_scaler, paths["feat_scaler"])
+        joblib.dump(tgt_scaler, paths["tgt_scaler"])
+        export_model(model, paths["lite"], "float32")
+        out.append((name, model, feat_scaler, tgt_scaler, paths))
+    return out
+
+
+def test_float32_export_matches_keras(bundles):
+    _, model, _, _, paths = bundles[0]
+    lite = LiteModel.load(paths["lite"])
+    x = np.random.default_rng(1).random((16, SEQ_LEN, FEATURES), dtype=np.float32)
+    assert lite.precision == "float32"
+    np.testing.assert_allclose(lite.predict(x), _keras_forward(model, x), atol=TOLERANCE)
+
+
+def test_stacked_predict_batch_matches_keras(bundles):
+    rng = np.random.default_rng(2)
+    items, expected = [], []
+    for name, model, feat_scaler, tgt_scaler, paths in bundles:
+        window = rng.normal(100, 10, (1, SEQ_LEN, FEATURES))
+        scaled = feat_scaler.transform(window[0]).astype(np.float32)[None, ...]
+        price = float(tgt_scaler.inverse_transform(_keras_forward(model, scaled))[0, 0])
+        # Prices are unscaled, so the tolerance grows with the target range
+        expected.append((price, TOLERANCE * float(tgt_scaler.data_range_[0])))
+        items.append((name, paths, window))
+
+    results = _predict_batch(items)
+
+    for (price, runtime), (want, tol) in zip(results, expected):
+        assert runtime == "lite"
+        assert price == pytest.approx(want, abs=tol)
+
+
+def test_stacked_forward_pass_equals_separate_calls(bundles):
+    lites = [LiteModel.load(paths["lite"]) for *_, paths in bundles]
+    x = np.random.default_rng(3).random((len(lites), 1, SEQ_LEN, FEATURES), dtype=np.float32)
+    stacked = LiteModel.stack(lites).predict(x)
+    for i, lite in enumerate(lites):
+        np.testing.assert_allclose(stacked[i], lite.predict(x[i]), atol=1e-6)
+
+
+@pytest.mark.parametrize("precision,bound,compression", [("float16", 1e-3, 1.9), ("int8", 1e-2, 3.0)])
+def test_reduced_precision_export_records_drift_and_size(bundles, tmp_path, precision, bound, compression):
+    _, model, _, _, paths = bundles[0]
+    lite_path, report = export_checked(paths["model"], str(tmp_path / f"{precision}.npz"), precision, max_drift=0.05)
+    lite = LiteModel.load(lite_path)
+    x = np.random.default_rng(5).random((64, SEQ_LEN, FEATURES), dtype=np.float32)
+
+    assert report["precision"] == precision and "fallback" not in report
+    assert lite.precision == precision
+    assert report["max_abs_drift"] < bound
+    assert np.max(np.abs(lite.predict(x) - _keras_forward(model, x))) < bound
+    assert report["compression"] >= compression
+    assert report["lite_bytes"] * compression < report["keras_bytes"]
+
+
+def test_export_falls_back_to_float32_over_the_drift_limit(bundles, tmp_path):
+    _, model, _, _, paths = bundles[0]
+    lite_path, report = export_checked(paths["model"], str(tmp_path / "int8.npz"), "int8", max_drift=0.0)
+    lite = LiteModel.load(lite_path)
+    x = np.random.default_rng(6).random((8, SEQ_LEN, FEATURES), dtype=np.float32)
+
+    assert report["fallback"] == "float32"
+    assert report["max_abs_drift"] > 0.0
+    assert lite.precision == "float32"
+    np.testing.assert_allclose(lite.predict(x), _keras_forward(model, x), atol=TOLERANCE)
+
+
+def test_compare_reports_parity(bundles):
+    # Timings in the report are not asserted: wall clock flakes on a loaded runner
+    *_, paths = bundles[0]
+    report = compare(paths["model"], paths["lite"], batch=4, runs=1)
+    assert report["max_abs_diff"] < TOLERANCE